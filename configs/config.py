@@ -45,6 +45,30 @@ S3_BUCKET_NAME = ""
 S3_ACCESS_KEY = ""
 S3_SECRET_KEY = ""
 S3_REGION = ""
+# Set to e.g. "http://localhost:9000" to upload to MinIO or moto_server instead of AWS
+S3_ENDPOINT_URL = None
+
+# S3 UPLOADS
+# Downloads are queued for a background uploader instead of uploading in the download path
+S3_UPLOAD_ENABLED = False
+S3_PREFIX = "rto_wise_data/"
+S3_UPLOAD_WORKERS = 8
+S3_UPLOAD_QUEUE_SIZE = 200
+S3_UPLOAD_RETRIES = 3
+S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+S3_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+
+# DOWNLOAD PIPELINE
+# Clean (and upload, if S3_UPLOAD_ENABLED) every download in the background while scraping
+PIPELINE_ENABLED = False
+PIPELINE_CLEAN_DIR = os.path.join(os.getcwd(), "cleaned_rto_wise_data")
+PIPELINE_CLEAN_FORMAT = "xlsx"
+# Cleaning processes; None uses the CPU count
+PIPELINE_CLEAN_WORKERS = None
+# Downloads allowed to wait for cleaning before the scraper is held back
+PIPELINE_MAX_PENDING = 100
+PIPELINE_PROGRESS_INTERVAL = 30
+PIPELINE_S3_PREFIX = "cleaned_rto_wise_data/"
 
 # EV and ICE
 FUEL_TYPES_EV = [7, 21]
@@ -78,6 +102,123 @@ USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/15.4 Safari/605.1.15"
 ]
 
+# RESOURCE BLOCKING
+# Requests the Excel export does not need are dropped through CDP Network.setBlockedURLs.
+# Scripts stay unblocked: PrimeFaces widgets and the dashboard charts share the page's JS.
+BLOCK_RESOURCES = True
+BLOCKED_URL_PATTERNS = [
+    # images
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp",
+    # fonts
+    "*.woff", "*.woff2", "*.ttf", "*.eot", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+    # analytics and other third-party hosts
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+]
+# At browser start, load the page uncached without and with blocking and log the savings
+MEASURE_RESOURCE_BLOCKING = False
+
+# BROWSER SESSIONS
+# Persistent Chrome profile per session (cached static assets); None uses a throwaway profile
+BROWSER_PROFILE_DIR = os.path.join(os.getcwd(), "browser_profiles")
+# Resolved chromedriver path is reused for this long before ChromeDriverManager checks again
+CHROMEDRIVER_CACHE_PATH = os.path.join(os.getcwd(), ".chromedriver_path.json")
+CHROMEDRIVER_CACHE_TTL_HOURS = 24
+
+# MULTI-YEAR MODE
+# Select every RTO once and export all its years from YEAR_STATE_MAPPING by only
+# switching the year dropdown (state -> RTO -> year instead of year -> state -> RTO)
+MULTI_YEAR = False
+
+# LOGGING
+LOG_DIR = "logs"
+# Run logs are JSON lines, rotated once a file reaches LOG_MAX_BYTES
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+# PERFORMANCE REPORT
+# perf_<timestamp>.json with p50/p95/max per step, state and worker is written here
+PERF_REPORT_DIR = "reports"
+
+# WORKER POOL
+# Number of isolated headless Chrome sessions; 1 keeps the sequential flow
+WORKER_COUNT = 1
+# Unit of work handed out from the shared queue: "state" or "rto"
+WORK_UNIT = "state"
+# Every worker downloads into its own sub directory of this folder
+WORKER_DOWNLOAD_DIR = os.path.join(os.getcwd(), "downloads")
+FAILED_PROCESSES_FILE = "failed_processes.json"
+# `python main.py retry` goes over what is still failing at most this many times
+RETRY_PASSES = 2
+
+# PROGRESS LEDGER
+LEDGER_PATH = os.path.join(os.getcwd(), "progress_ledger.db")
+# Record RTO files already present in rto_wise_data as done instead of downloading again
+LEDGER_ADOPT_EXISTING_FILES = True
+# The current year's exports grow every month, so its existing files are downloaded again by default
+LEDGER_ADOPT_CURRENT_YEAR = False
+
+# DISTRIBUTED WORK QUEUE
+# `python main.py coordinator` fills this queue, `python main.py node` on every machine drains it.
+# Put it on a volume all nodes mount.
+WORK_QUEUE_PATH = os.path.join(os.getcwd(), "work_queue.db")
+# A leased task is handed to another node if not renewed within this many seconds
+QUEUE_LEASE_SECONDS = 600
+# Tasks of one state leased together, so a node configures the state once per batch
+QUEUE_LEASE_BATCH = 5
+QUEUE_MAX_ATTEMPTS = 3
+QUEUE_POLL_INTERVAL = 10
+
+# PLANNER
+# Used by `python main.py plan` and the worker pool queue order
+PLAN_FILE = "plan.json"
+# States with more pending RTOs than this are split into several tasks
+PLANNER_CHUNK_SIZE = 40
+# Cost estimates until perf reports exist in PERF_REPORT_DIR (seconds)
+PLANNER_DEFAULT_RTO_SECONDS = 20
+PLANNER_DEFAULT_SETUP_SECONDS = 30
+
+# RTO CATALOGUE
+RTO_CATALOGUE_PATH = os.path.join(os.getcwd(), "rto_catalogue.json")
+# Cached RTO lists older than this are scraped again when the state is configured
+RTO_CATALOGUE_TTL_DAYS = 7
+
+# PACING
+# Random pause (seconds) kept after the page is idle, instead of fixed random_delay ranges
+POLITENESS_DELAY = (0.1, 0.3)
+PACING_POLL_INTERVAL = 0.1
+# Readiness wait before any latency has been learned for a step, also the upper bound
+PACING_DEFAULT_TIMEOUT = 30
+PACING_MIN_TIMEOUT = 5
+PACING_MIN_SAMPLES = 20
+PACING_TIMEOUT_FACTOR = 3
+PACING_HISTORY = 500
+
+# DOWNLOADS
+DOWNLOAD_TIMEOUT = 60
+# Only used where inotify is unavailable
+DOWNLOAD_POLL_INTERVAL = 0.2
+
+# BACKOFF AND CIRCUIT BREAKER
+# Backoff after a 503 or site timeout starts at BACKOFF_BASE seconds and doubles up to BACKOFF_MAX
+BACKOFF_BASE = 5
+BACKOFF_MAX = 900
+# Attempts a single element lookup makes after site timeouts before giving up
+BACKOFF_MAX_ATTEMPTS = 5
+# This many failures from any workers within the window pause all workers
+CIRCUIT_FAILURE_THRESHOLD = 3
+CIRCUIT_FAILURE_WINDOW = 120
+HEALTH_PROBE_TIMEOUT = 10
+
+# HTTP REPLAY ENGINE
+# "selenium" clicks through every RTO, "replay" captures the JSF view once per
+# state and posts the PrimeFaces partial submits and the export directly
+ENGINE = "selenium"
+REPLAY_TIMEOUT = 60
+REPLAY_POOL_SIZE = 10
+REPLAY_RENDER = "@all"
+# Directory to record replayed responses into for rto_processor.replay_stub (None disables)
+REPLAY_RECORD_DIR = None
+
 PREFS = {
     "download.default_directory": BASE_DOWNLOAD_DIR,
     "download.prompt_for_download": False,
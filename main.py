@@ -1,38 +1,106 @@
+import argparse
+import datetime
 import logging
 from rto_processor.processor import RTOProcessor
-from rto_processor.browser import Browser
+from rto_processor.session import sessions
+from rto_processor.ledger import ProgressLedger
+from rto_processor.replay import JSFReplayEngine
+from rto_processor.catalogue import rto_catalogue, log_workload_plan
+from rto_processor.planner import build_tasks, shard_tasks, write_plan, load_plan_shard, log_plan, mark_state_if_complete
+from rto_processor.work_queue import WorkQueue, ALL_RTOS
+from rto_processor.profiling import profiler
+from rto_processor.circuit import circuit_breaker, backoff_sleep
+from rto_processor.uploader import get_uploader, close_uploader
+from rto_processor.pipeline import get_pipeline, close_pipeline
 from rto_processor.utils import *
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import os
 import json
+import queue
+import socket
+import threading
+import time
 from configs import config
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape RTO-wise Vahan data")
+    subcommands = parser.add_subparsers(dest="command")
+
+    scrape = subcommands.add_parser("scrape", help="Scrape YEAR_STATE_MAPPING (default without a command)")
+    scrape.add_argument("--plan", help="Plan file written by the plan command")
+    scrape.add_argument("--shard", type=int, default=0, help="Shard of --plan to run on this machine")
+
+    plan = subcommands.add_parser("plan", help="Split the pending work into cost-balanced shards")
+    plan.add_argument("--shards", type=int, default=config.WORKER_COUNT, help="Number of workers or machines")
+    plan.add_argument("--output", default=config.PLAN_FILE)
+    plan.add_argument("--chunk-size", type=int, default=None, help="Max RTOs per task (default: PLANNER_CHUNK_SIZE)")
+
+    coordinator = subcommands.add_parser("coordinator", help="Fill the shared work queue and watch it drain")
+    coordinator.add_argument("--queue", default=None, help="Work queue path (default: WORK_QUEUE_PATH)")
+
+    node = subcommands.add_parser("node", help="Lease and scrape tasks from the shared work queue")
+    node.add_argument("--queue", default=None, help="Work queue path (default: WORK_QUEUE_PATH)")
+    node.add_argument("--node-id", default=None, help="Name in leases and logs (default: <host>-<pid>)")
+
+    reset = subcommands.add_parser("reset", help="Clear ledger progress so a year or state is downloaded again")
+    reset.add_argument("--year", required=True)
+    reset.add_argument("--state", default=None, help="State as in YEAR_STATE_MAPPING (default: every state)")
+
+    retry = subcommands.add_parser("retry", help="Scrape only the RTOs listed in failed processes files")
+    retry.add_argument("files", nargs="*", default=[config.FAILED_PROCESSES_FILE])
+    retry.add_argument("--passes", type=int, default=config.RETRY_PASSES,
+                       help="Retry passes over what is still failing")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "plan":
+        start_planner(args.shards, args.output, args.chunk_size)
+        return
+    if args.command == "coordinator":
+        start_coordinator(args.queue)
+        return
+    if args.command == "reset":
+        ProgressLedger().reset(args.year, args.state)
+        return
+
     try:
         # Start the scraping process
-        start_scrapper()
+        if args.command == "node":
+            start_node(args.queue, args.node_id)
+        elif args.command == "retry":
+            start_retry(args.files, args.passes)
+        elif getattr(args, "plan", None):
+            start_plan_shard(args.plan, args.shard)
+        elif config.WORKER_COUNT > 1:
+            start_worker_pool()
+        elif config.MULTI_YEAR:
+            start_multi_year_scrapper()
+        else:
+            start_scrapper()
         
     except Exception as e:
         logger.error(f"Error in main: {str(e)}", exc_info=True)
         raise
     finally:
-        try:
-            if 'browser' in locals():
-                browser.driver.quit()
-                logger.info("Browser closed successfully")
-        except Exception as e:
-            logger.error(f"Error while closing browser: {str(e)}")
+        # Let queued cleaning and uploads finish before the process exits
+        close_pipeline()
+        close_uploader()
+        # Browser sessions stay warm for the whole run and are closed once here
+        sessions.close_all()
 
 def start_scrapper():
     """Main function to start the RTO data scraping process."""
     try:
-        browser = Browser()
+        log_workload_plan(config.YEAR_STATE_MAPPING)
+        browser = sessions.acquire("main")
         processor = RTOProcessor(browser)
+        ledger = ProgressLedger()
         log_message("\n=== Starting RTO-wise processing ===")
         year_state_mapping = config.YEAR_STATE_MAPPING
         
@@ -49,10 +117,14 @@ def start_scrapper():
             browser.update_download_directory(year_download_dir)
 
             for state in states:
+                if ledger.is_state_done(year, state):
+                    log_message(f"\nSkipping state: {state}, Year: {year} (already complete in ledger)")
+                    continue
+
                 log_message(f"\nProcessing state: {state}, Year: {year}")
                 
                 # Process RTOs for this state and year
-                failed_rtos = process_rto_wise_data(processor, state, year)
+                failed_rtos = process_rto_wise_data(processor, state, year, ledger=ledger)
                 
                 if failed_rtos:
                     failed_processes.append({
@@ -68,25 +140,493 @@ def start_scrapper():
                 log_message(f"Failed to process {len(process['failed_rtos'])} RTOs in {process['state']} ({process['year']}):")
                 for rto in process['failed_rtos']:
                     log_message(f"  - {rto}")
-            with open("failed_processes.json", "w") as f:
-                json.dump(failed_processes, f, indent=4)
+            save_failed_processes(failed_processes)
         else:
             log_message("\n=== All RTOs processed successfully ===")
+
+        profiler.write_report()
             
     except Exception as e:
         log_message(f"Error in start_scrapper: {str(e)}", exc_info=True)
         raise
 
-def handle_503_and_recover(processor, retry_delay=900):
+def start_multi_year_scrapper():
+    """
+    Scrape every year of YEAR_STATE_MAPPING with one navigation per RTO.
+
+    The loop runs state -> RTO -> year: a state is configured once, each RTO
+    is selected and filtered once, and only the year dropdown changes between
+    exports. Files are routed to rto_wise_data/<year>/<state> by year.
+    """
+    log_workload_plan(config.YEAR_STATE_MAPPING)
+    browser = sessions.acquire("main")
+    processor = RTOProcessor(browser)
+    ledger = ProgressLedger()
+    log_message("\n=== Starting multi-year RTO-wise processing ===")
+    # Exports of every year land here and are moved to rto_wise_data/<year>/<state>
+    browser.update_download_directory(config.BASE_DOWNLOAD_DIR)
+
+    state_years = {}
+    for year, states in config.YEAR_STATE_MAPPING.items():
+        for state in states:
+            state_years.setdefault(state, []).append(str(year))
+
+    failed = {}
+    for state, years in state_years.items():
+        years = [year for year in years if not ledger.is_state_done(year, state)]
+        if not years:
+            log_message(f"\nSkipping state: {state} (all years complete in ledger)")
+            continue
+
+        log_message(f"\nProcessing state: {state}, Years: {', '.join(years)}")
+        rto_list = configure_state(processor, state, years[0])
+        if not rto_list:
+            for year in years:
+                failed[(year, state)] = ["All RTOs (configuration failed)"]
+            continue
+
+        for index, rto in enumerate(rto_list):
+            pending_years = [year for year in years if not is_rto_done(processor, ledger, state, year, rto)]
+            if not pending_years:
+                continue
+            log_message(f"\nProcessing RTO {index + 1}/{len(rto_list)}: {rto} for {', '.join(pending_years)}")
+            for year in process_rto_years(processor, state, pending_years, rto, ledger):
+                failed.setdefault((year, state), []).append(rto)
+
+        for year in years:
+            if not failed.get((year, state)):
+                ledger.mark_state_done(year, state, len(rto_list))
+
+    failed_processes = [
+        {'state': state, 'year': year, 'failed_rtos': failed_rtos}
+        for (year, state), failed_rtos in failed.items()
+    ]
+    if failed_processes:
+        log_message("\n=== Processing Summary (Failed) ===")
+        for process in failed_processes:
+            log_message(f"Failed to process {len(process['failed_rtos'])} RTOs in {process['state']} ({process['year']})")
+        save_failed_processes(failed_processes)
+    else:
+        log_message("\n=== All RTOs processed successfully ===")
+    profiler.write_report()
+    return failed_processes
+
+def process_rto_years(processor, state_name, years, rto, ledger=None, max_attempts=2):
+    """
+    Select an RTO once and export it for each year by switching only the
+    year dropdown. Returns the years that could not be exported.
+    """
+    with log_context(state=state_name, rto=rto):
+        engine = get_rto_engine(processor)
+        remaining = list(years)
+
+        for attempt in range(max_attempts):
+            try:
+                circuit_breaker.wait_until_closed()
+                # Start with the year already on the page to save one dropdown change
+                remaining.sort(key=lambda year: year != engine.selected_year)
+                if not engine.select_specific_rto(rto, state_name, remaining[0]):
+                    log_message(f"Failed to select RTO: {rto}")
+                else:
+                    for year in list(remaining):
+                        if ledger:
+                            ledger.record_attempt(year, state_name, rto)
+                        if engine.selected_year != year and not engine.select_year(year):
+                            log_message(f"Failed to select year {year} for RTO: {rto}")
+                            break
+                        if not engine.is_rto_selected(rto) and not engine.select_specific_rto(rto, state_name, year):
+                            log_message(f"RTO selection lost after switching to {year}: {rto}")
+                            break
+                        if not engine.apply_filters() or not engine.download_excel_rto(state_name, year, rto):
+                            log_message(f"Failed to export {rto} for {year}")
+                            break
+                        record_download(ledger, year, state_name, rto, engine.last_download_path)
+                        remaining.remove(year)
+
+                if not remaining:
+                    record_rto_success(processor)
+                    log_message(f"Successfully processed RTO: {rto} for {', '.join(years)}")
+                    return []
+            except Exception as e:
+                log_message(f"Unexpected error processing RTO {rto} across years: {str(e)}")
+
+            if attempt < max_attempts - 1:
+                log_message("Attempting to recover...")
+                if not recover_state(processor, state_name, remaining[0]):
+                    break
+
+        if ledger:
+            for year in remaining:
+                ledger.mark_failed(year, state_name, rto)
+        return remaining
+
+
+def load_failed_processes(paths):
+    """
+    {(year, state): RTO list} from failed processes files, merged across
+    files. None stands for the whole state, for entries such as
+    "All RTOs (configuration failed)".
+    """
+    failed = {}
+    for path in paths:
+        with open(path) as f:
+            for process in json.load(f):
+                key = (str(process['year']), process['state'])
+                rtos = process.get('failed_rtos') or []
+                if key in failed and failed[key] is None:
+                    continue
+                if not rtos or any(rto.startswith("All RTOs") for rto in rtos):
+                    failed[key] = None
+                else:
+                    failed[key] = list(dict.fromkeys((failed.get(key) or []) + rtos))
+    return failed
+
+def start_retry(paths, passes=1):
+    """
+    Re-run only the failed RTOs of one or more failed processes files. Each
+    (year, state) is configured once per pass, RTOs the ledger has finished
+    since are skipped, and every file is rewritten with its entries that
+    still fail (or removed from the list when nothing is left). A (year,
+    state) listed in several files is written back to the first of them only.
+    """
+    missing = [path for path in paths if not os.path.exists(path)]
+    for path in missing:
+        log_message(f"Failed processes file not found: {path}")
+    paths = [path for path in paths if path not in missing]
+    if not paths:
+        log_message("Nothing to retry")
+        return {}
+
+    pending = load_failed_processes(paths)
+    owners = {}
+    for path in paths:
+        for key in load_failed_processes([path]):
+            owners.setdefault(key, path)
+    log_message(f"\n=== Retrying {sum(len(rtos) for rtos in pending.values() if rtos)} RTOs and "
+                f"{sum(1 for rtos in pending.values() if rtos is None)} whole states from {', '.join(paths)} ===")
+
+    browser = sessions.acquire("main")
+    processor = RTOProcessor(browser)
+    ledger = ProgressLedger()
+    failed = {}
+    for retry_pass in range(max(1, passes)):
+        failed = {}
+        for (year, state), rtos in pending.items():
+            log_message(f"\nRetry pass {retry_pass + 1}: {state}, Year: {year}, "
+                        f"{len(rtos) if rtos else 'all'} RTOs")
+            browser.update_download_directory(os.path.join(config.BASE_DOWNLOAD_DIR, str(year)))
+            failed_rtos = process_rto_wise_data(processor, state, year, specific_rtos=rtos, ledger=ledger)
+            if failed_rtos:
+                failed[(year, state)] = failed_rtos
+
+        still_pending = {}
+        for key, failed_rtos in failed.items():
+            if any(rto.startswith("All RTOs") for rto in failed_rtos):
+                # The state could not be configured: retry the same RTOs, not the whole state
+                still_pending[key] = pending[key]
+                if pending[key]:
+                    failed[key] = list(pending[key])
+            else:
+                still_pending[key] = failed_rtos
+        if not still_pending or still_pending == pending:
+            break
+        pending = still_pending
+
+    for path in paths:
+        remaining = [
+            {'state': state, 'year': year, 'failed_rtos': failed_rtos}
+            for (year, state), failed_rtos in failed.items() if owners.get((year, state)) == path
+        ]
+        save_failed_processes(remaining, path)
+        log_message(f"{path}: {sum(len(process['failed_rtos']) for process in remaining)} entries still failing")
+    profiler.write_report()
+    return failed
+
+def save_failed_processes(failed_processes, path=None):
+    """Write the failed (state, year) entries to the failed processes file"""
+    path = path or config.FAILED_PROCESSES_FILE
+    with open(path, "w") as f:
+        json.dump(failed_processes, f, indent=4)
+    log_message(f"Failed processes written to {path}")
+
+def start_planner(shard_count, output_path, chunk_size=None):
+    """Build the pending task list from the catalogue and ledger and write LPT-balanced shards"""
+    ledger = ProgressLedger()
+    tasks = build_tasks(config.YEAR_STATE_MAPPING, ledger, chunk_size=chunk_size)
+    shards = shard_tasks(tasks, max(1, shard_count))
+    write_plan(shards, output_path)
+    log_plan(shards)
+    log_message(f"Plan written to {output_path}")
+    return shards
+
+def start_plan_shard(plan_path, shard_index):
+    """Run one shard of a plan file with a single browser session"""
+    tasks = load_plan_shard(plan_path, shard_index)
+    log_message(f"\n=== Running shard {shard_index} of {plan_path}: {len(tasks)} tasks ===")
+    browser = sessions.acquire("main")
+    processor = RTOProcessor(browser)
+    ledger = ProgressLedger()
+
+    failed = {}
+    for task in tasks:
+        year_download_dir = os.path.join(config.BASE_DOWNLOAD_DIR, str(task.year))
+        browser.update_download_directory(year_download_dir)
+        failed_rtos = process_rto_wise_data(processor, task.state, task.year, specific_rtos=task.rtos, ledger=ledger)
+        if failed_rtos:
+            failed.setdefault((task.year, task.state), []).extend(failed_rtos)
+        elif task.rtos:
+            # Chunked states are never marked done by process_state itself
+            mark_state_if_complete(ledger, task.year, task.state)
+
+    failed_processes = report_failed_processes(failed, f"failed_processes_shard_{shard_index}.json")
+    profiler.write_report()
+    return failed_processes
+
+def start_coordinator(queue_path=None):
+    """
+    Put every pending (year, state, RTO) of YEAR_STATE_MAPPING on the shared
+    work queue, reclaim expired leases while nodes work through it and write
+    the failed processes file once it is drained. States missing from the
+    RTO catalogue are queued as one listing task that a node expands.
+    """
+    work_queue = WorkQueue(queue_path)
+    tasks = []
+    for task in build_tasks(config.YEAR_STATE_MAPPING, ProgressLedger()):
+        if task.rtos is None:
+            tasks.append((task.year, task.state, ALL_RTOS))
+        else:
+            tasks.extend((task.year, task.state, rto) for rto in task.rtos)
+    added = work_queue.enqueue(tasks)
+    log_message(f"Queued {added} new tasks ({len(tasks) - added} already queued) in {work_queue.path}")
+
+    last_counts = None
+    while not work_queue.is_drained():
+        time.sleep(config.QUEUE_POLL_INTERVAL)
+        reclaimed = work_queue.reclaim_expired()
+        if reclaimed:
+            log_message(f"Reclaimed {reclaimed} expired leases")
+        counts = work_queue.counts()
+        if counts != last_counts:
+            log_message(f"Work queue: {counts}")
+            last_counts = counts
+
+    failed = {}
+    for year, state, rto in work_queue.failed_tasks():
+        failed.setdefault((year, state), []).append(
+            "All RTOs (configuration failed)" if rto == ALL_RTOS else rto)
+    return report_failed_processes(failed)
+
+def start_node(queue_path=None, node_id=None):
+    """Lease batches of tasks from the shared work queue and scrape them until it is drained"""
+    node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+    bind_log_context(node=node_id)
+    work_queue = WorkQueue(queue_path)
+    browser = sessions.acquire("main")
+    processor = RTOProcessor(browser)
+    ledger = ProgressLedger()
+    log_message(f"\n=== Node {node_id} working on {work_queue.path} ===")
+
+    # (year, state) the session is configured for; leases prefer more work of it
+    configured = None
+    while True:
+        leased = work_queue.lease(node_id, prefer=configured)
+        if not leased:
+            if work_queue.is_drained():
+                break
+            time.sleep(config.QUEUE_POLL_INTERVAL)
+            continue
+
+        year, state, _ = leased[0]
+        if configured != (year, state):
+            browser.update_download_directory(os.path.join(config.BASE_DOWNLOAD_DIR, str(year)))
+            specific_rtos = [rto for _, _, rto in leased if rto != ALL_RTOS] or None
+            configured = (year, state) if configure_state(processor, state, year, specific_rtos) else None
+            if not configured:
+                for task in leased:
+                    work_queue.fail(node_id, *task)
+                continue
+
+        for index, task in enumerate(leased):
+            rto = task[2]
+            try:
+                if rto == ALL_RTOS:
+                    rto_list = get_rto_list(processor, state)
+                    if rto_list:
+                        work_queue.enqueue([(year, state, name) for name in rto_list])
+                    done = bool(rto_list)
+                else:
+                    done = (is_rto_done(processor, ledger, state, year, rto)
+                            or not process_rtos(processor, state, year, [rto], ledger=ledger))
+            except Exception as e:
+                log_message(f"Unexpected error on task {state} ({year}) {rto}: {str(e)}")
+                done = False
+
+            if done:
+                work_queue.complete(node_id, *task)
+                work_queue.renew(node_id, leased[index + 1:])
+            else:
+                # The session needs configuring again; the rest of the lease goes
+                # back to the queue without spending one of its attempts
+                work_queue.fail(node_id, *task)
+                work_queue.release(node_id, leased[index + 1:])
+                configured = None
+                break
+
+    log_message(f"Node {node_id}: work queue drained")
+    profiler.write_report()
+
+def report_failed_processes(failed, path=None):
+    """Log the {(year, state): failed RTOs} summary and write the failed processes file"""
+    failed_processes = [
+        {'state': state, 'year': year, 'failed_rtos': failed_rtos}
+        for (year, state), failed_rtos in failed.items() if failed_rtos
+    ]
+    if failed_processes:
+        log_message("\n=== Processing Summary (Failed) ===")
+        for process in failed_processes:
+            log_message(f"Failed to process {len(process['failed_rtos'])} RTOs in {process['state']} ({process['year']})")
+        save_failed_processes(failed_processes, path)
+    else:
+        log_message("\n=== All RTOs processed successfully ===")
+    return failed_processes
+
+def start_worker_pool(worker_count=None, work_unit=None):
+    """
+    Scrape YEAR_STATE_MAPPING with several isolated browser sessions.
+
+    Every worker owns a headless Chrome with its own download directory and
+    pulls work from a shared queue. With work_unit "state" a worker processes
+    a whole state; with "rto" the first worker to pick up a state lists its
+    RTOs and puts them back on the queue so idle workers can share the state.
+    """
+    worker_count = worker_count or config.WORKER_COUNT
+    work_unit = work_unit or config.WORK_UNIT
+    log_message(f"\n=== Starting worker pool: {worker_count} workers, unit: {work_unit} ===")
+    log_workload_plan(config.YEAR_STATE_MAPPING)
+
+    ledger = ProgressLedger()
+    tasks = queue.Queue()
+    # Most expensive first: with a shared queue this is LPT scheduling, so the
+    # last state to start is a short one instead of Tamil Nadu
+    for task in sorted(build_tasks(config.YEAR_STATE_MAPPING, ledger), key=lambda task: task.cost, reverse=True):
+        tasks.put(("state", task.year, task.state, task.rtos))
+
+    failed = {}
+    failed_lock = threading.Lock()
+
+    # Launch every worker's Chrome at once instead of one after another
+    sessions.warm_up(
+        [f"worker_{worker_id}" for worker_id in range(worker_count)],
+        {f"worker_{worker_id}": os.path.join(config.WORKER_DOWNLOAD_DIR, f"worker_{worker_id}")
+         for worker_id in range(worker_count)},
+    )
+
+    workers = [
+        threading.Thread(
+            target=run_worker,
+            args=(worker_id, tasks, failed, failed_lock, work_unit, ledger),
+            name=f"worker-{worker_id}",
+            daemon=True,
+        )
+        for worker_id in range(worker_count)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    failed_processes = report_failed_processes(failed)
+    profiler.write_report()
+    return failed_processes
+
+def run_worker(worker_id, tasks, failed, failed_lock, work_unit, ledger=None):
+    """Worker loop: owns one browser session and drains the shared task queue"""
+    bind_log_context(worker=worker_id)
+    profile = f"worker_{worker_id}"
+    download_dir = os.path.join(config.WORKER_DOWNLOAD_DIR, profile)
+    try:
+        browser = sessions.acquire(profile, download_dir)
+        processor = RTOProcessor(browser)
+    except Exception as e:
+        log_message(f"[worker {worker_id}] Failed to start browser: {str(e)}")
+        sessions.discard(profile)
+        return
+
+    # (year, state) the session is currently configured for in "rto" mode
+    configured = None
+    try:
+        while True:
+            try:
+                kind, year, state, rto = tasks.get(timeout=1)
+            except queue.Empty:
+                # Another worker may still be expanding a state into RTO tasks
+                if tasks.unfinished_tasks == 0:
+                    break
+                continue
+
+            try:
+                # A state task carries the planned chunk of RTOs, or None for the whole state
+                if kind == "state" and work_unit == "state":
+                    log_message(f"\n[worker {worker_id}] Processing state: {state}, Year: {year}")
+                    failed_rtos = process_rto_wise_data(processor, state, year, specific_rtos=rto, ledger=ledger)
+                elif kind == "state":
+                    log_message(f"\n[worker {worker_id}] Listing RTOs for state: {state}, Year: {year}")
+                    rto_list = configure_state(processor, state, year, specific_rtos=rto)
+                    if rto_list:
+                        configured = (year, state)
+                        for rto_name in rto_list:
+                            if not is_rto_done(processor, ledger, state, year, rto_name):
+                                tasks.put(("rto", year, state, rto_name))
+                        failed_rtos = []
+                    else:
+                        configured = None
+                        failed_rtos = ["All RTOs (configuration failed)"]
+                else:
+                    if configured != (year, state):
+                        configured = (year, state) if configure_state(processor, state, year, specific_rtos=[rto]) else None
+                    if configured:
+                        failed_rtos = process_rtos(processor, state, year, [rto], ledger=ledger)
+                    else:
+                        failed_rtos = [rto]
+
+                with failed_lock:
+                    failed.setdefault((year, state), []).extend(failed_rtos)
+                    # Chunks of one state run on different workers; the last one marks it done
+                    if kind == "state" and work_unit == "state" and rto and not failed_rtos and ledger:
+                        mark_state_if_complete(ledger, year, state)
+            except Exception as e:
+                log_message(f"[worker {worker_id}] Unexpected error on {kind} task {state} ({year}): {str(e)}")
+                with failed_lock:
+                    if isinstance(rto, list):
+                        failed.setdefault((year, state), []).extend(rto)
+                    else:
+                        failed.setdefault((year, state), []).append(rto or "All RTOs (unexpected error)")
+            finally:
+                tasks.task_done()
+    finally:
+        log_message(f"[worker {worker_id}] Finished")
+
+def record_rto_success(processor):
+    """An RTO was exported: the site is healthy again for the circuit and this session's backoff"""
+    circuit_breaker.record_success()
+    processor.consecutive_503s = 0
+
+def handle_503_and_recover(processor):
     """
     Handle recovery from a 503 Bad Gateway error.
-    Waits, refreshes the page, and re-sets axis configuration.
+    Backs off exponentially in the number of 503s this session has hit since
+    its last export, waits while the shared circuit is open, refreshes the
+    page, and re-sets axis configuration.
     """
-    log_message(f"503 error detected. Waiting {retry_delay // 60} minutes before retrying...")
-    time.sleep(retry_delay)
+    circuit_breaker.record_failure("503")
+    backoff_sleep(processor.consecutive_503s, "503 error detected")
+    processor.consecutive_503s += 1
+    circuit_breaker.wait_until_closed()
 
     try:
-        processor.browser.driver.refresh()
+        processor.browser.renavigate()
+        if processor.replay:
+            processor.replay.invalidate()
         WebDriverWait(processor.browser.driver, 30).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, "[name='javax.faces.ViewState']"))
         )
@@ -94,6 +634,7 @@ def handle_503_and_recover(processor, retry_delay=900):
         
         if not processor.setup_axis():
             raise Exception("Axis setup failed after 503 recovery")
+        circuit_breaker.record_success()
         
         log_message("Axis re-setup successful after 503 recovery.")
         return True
@@ -101,7 +642,7 @@ def handle_503_and_recover(processor, retry_delay=900):
         log_message(f"Failed to recover after 503: {str(e)}")
         return False
 
-def process_rto_wise_data(processor, state_name, year, specific_rtos=None, start_rto_index=0):
+def process_rto_wise_data(processor, state_name, year, specific_rtos=None, start_rto_index=0, ledger=None):
     """
     Main function to process RTO-wise data with resume capability
     """
@@ -109,7 +650,7 @@ def process_rto_wise_data(processor, state_name, year, specific_rtos=None, start
         log_message(f"\n=== Starting RTO-wise processing for {state_name}, {year} ===\n")
         
         # Process the state with RTO processing
-        failed_rtos = process_state(processor, state_name, year, start_rto_index, specific_rtos)
+        failed_rtos = process_state(processor, state_name, year, start_rto_index, specific_rtos, ledger)
         
         log_message(f"\n=== Processing completed for {state_name} ===\n")
         log_message(f"Failed RTOs: {failed_rtos if failed_rtos else 'None'}")
@@ -120,7 +661,7 @@ def process_rto_wise_data(processor, state_name, year, specific_rtos=None, start
         log_message(f"Unexpected error in process_rto_wise_data: {str(e)}")
         return ["All RTOs (unexpected error)"]
 
-def process_state(processor, state_name, year, start_rto_index=0, specific_rtos=None):
+def process_state(processor, state_name, year, start_rto_index=0, specific_rtos=None, ledger=None):
     """
     Process a single state with RTO processing resumption
     """
@@ -129,47 +670,103 @@ def process_state(processor, state_name, year, start_rto_index=0, specific_rtos=
     if not rto_list:
         return ["All RTOs (configuration failed)"]
     
-    # 2. Process RTOs starting from the given index
-    failed_rtos = process_rtos(processor, state_name, year, rto_list, start_rto_index)
+    # 2. Skip RTOs the ledger already has a file for
+    pending_rtos = [
+        rto for rto in rto_list[start_rto_index:]
+        if not is_rto_done(processor, ledger, state_name, year, rto)
+    ]
+    if len(pending_rtos) < len(rto_list) - start_rto_index:
+        log_message(f"Ledger: {len(rto_list) - len(pending_rtos)}/{len(rto_list)} RTOs already done, "
+                    f"resuming with {pending_rtos[0] if pending_rtos else 'nothing'}")
+
+    # 3. Process the remaining RTOs
+    failed_rtos = process_rtos(processor, state_name, year, pending_rtos, ledger=ledger)
 
     log_message(f"Successfully processed: {len(rto_list) - len(failed_rtos)}/{len(rto_list)} RTOs")
+
+    if ledger and not failed_rtos and not specific_rtos and start_rto_index == 0:
+        ledger.mark_state_done(year, state_name, len(rto_list))
     
     return failed_rtos
 
+def is_rto_done(processor, ledger, state_name, year, rto):
+    """
+    Check the ledger for a finished RTO. Files already sitting in
+    rto_wise_data/<year>/<state> are adopted into the ledger when enabled,
+    except for the current year unless LEDGER_ADOPT_CURRENT_YEAR.
+    """
+    if not ledger:
+        return False
+    if ledger.is_done(year, state_name, rto):
+        return True
+    if not config.LEDGER_ADOPT_EXISTING_FILES:
+        return False
+    if str(year) == str(datetime.date.today().year) and not config.LEDGER_ADOPT_CURRENT_YEAR:
+        return False
+    output_path = processor.get_output_path(state_name, year, rto)
+    if os.path.exists(output_path):
+        ledger.mark_done(year, state_name, rto, output_path)
+        return True
+    return False
+
 def configure_state(processor, state_name, year, specific_rtos=None):
     """
     Configure the state (axis, state, year) and return RTO list
     Returns None if configuration fails
     """
-    try:
-        # Setup axis
-        if not processor.setup_axis():
-            log_message("Failed to setup axis configuration")
-            return None
+    # Setup steps are reported under the state they configure
+    with log_context(state=state_name, year=str(year)):
+        try:
+            # A captured replay view belongs to the previous state
+            if processor.replay:
+                processor.replay.invalidate()
 
-        # Select state
-        if not processor.select_state_primefaces(state_name):
-            log_message(f"Failed to select state: {state_name}")
-            return None
+            # Setup axis
+            if not processor.setup_axis():
+                log_message("Failed to setup axis configuration")
+                return None
 
-        # Select year
-        if not processor.select_year(year):
-            log_message(f"Failed to select year: {year}")
-            return None
+            # Select state
+            if not processor.select_state_primefaces(state_name):
+                log_message(f"Failed to select state: {state_name}")
+                return None
 
-        # Get RTO list if not provided
-        rto_list = specific_rtos or processor.get_all_rtos_for_state()
-        if not rto_list:
-            log_message("No RTOs found for the selected state")
+            # Select year
+            if not processor.select_year(year):
+                log_message(f"Failed to select year: {year}")
+                return None
+
+            # Get RTO list if not provided
+            rto_list = specific_rtos or get_rto_list(processor, state_name)
+            if not rto_list:
+                log_message("No RTOs found for the selected state")
+                return None
+
+            return rto_list
+
+        except Exception as e:
+            log_message(f"Error in configure_state: {str(e)}")
             return None
 
-        return rto_list
+def get_rto_list(processor, state_name, catalogue=rto_catalogue):
+    """
+    RTO list from the on-disk catalogue; the dropdown is only scraped when
+    the cached entry is missing or older than RTO_CATALOGUE_TTL_DAYS.
+    """
+    cached = catalogue.get(state_name)
+    if cached and catalogue.is_fresh(state_name):
+        log_message(f"Using {len(cached)} catalogued RTOs for {state_name}")
+        return cached
 
-    except Exception as e:
-        log_message(f"Error in configure_state: {str(e)}")
-        return None
+    rto_list = processor.get_all_rtos_for_state()
+    if rto_list:
+        catalogue.update(state_name, rto_list)
+        return rto_list
+    if cached:
+        log_message(f"Could not refresh RTO list, using stale catalogue entry for {state_name}")
+    return cached
 
-def process_rtos(processor, state_name, year, rto_list, start_index=0):
+def process_rtos(processor, state_name, year, rto_list, start_index=0, ledger=None):
     """
     Process RTOs starting from the given index
     Returns list of failed RTOs
@@ -183,10 +780,14 @@ def process_rtos(processor, state_name, year, rto_list, start_index=0):
         
         for attempt in range(max_attempts):
             try:
+                circuit_breaker.wait_until_closed()
                 log_message(f"\nProcessing RTO {index + 1}/{len(rto_list)}: {rto} (Attempt {attempt + 1}/{max_attempts})")
+                if ledger:
+                    ledger.record_attempt(year, state_name, rto)
                 
                 # Try to process the current RTO
                 if process_single_rto(processor, state_name, year, rto):
+                    record_rto_success(processor)
                     success = True
                     break
                 
@@ -212,60 +813,102 @@ def process_rtos(processor, state_name, year, rto_list, start_index=0):
                     failed_rtos.append(rto)
                 if not recover_state(processor, state_name, year):
                     break
+
+        if success:
+            record_download(ledger, year, state_name, rto, get_rto_engine(processor).last_download_path)
+        elif ledger:
+            ledger.mark_failed(year, state_name, rto)
     
     return failed_rtos
 
+def record_download(ledger, year, state_name, rto, path):
+    """Mark a finished download in the ledger and hand it to the pipeline and uploader"""
+    if not path:
+        return
+    if ledger:
+        ledger.mark_done(year, state_name, rto, path)
+    pipeline = get_pipeline()
+    if pipeline:
+        pipeline.submit(path, year)
+    uploader = get_uploader()
+    if uploader:
+        uploader.submit(path)
+
+def get_rto_engine(processor):
+    """Return the object that runs the per-RTO select/filter/download steps"""
+    if config.ENGINE != "replay":
+        return processor
+    if processor.replay is None:
+        processor.replay = JSFReplayEngine(processor)
+    return processor.replay
+
 def process_single_rto(processor, state_name, year, rto):
     """Process a single RTO with the given configuration"""
-    try:
-        # Select RTO
-        if not processor.select_specific_rto(rto, state_name, year):
-            log_message(f"Failed to select RTO: {rto}")
-            return False
+    with log_context(state=state_name, year=str(year), rto=rto):
+        try:
+            engine = get_rto_engine(processor)
+            start_time = time.monotonic()
+
+            # Select RTO
+            if not engine.select_specific_rto(rto, state_name, year):
+                log_message(f"Failed to select RTO: {rto}")
+                return False
             
-        # Apply filters
-        if not processor.apply_filters():
-            log_message("Failed to apply filters")
-            return False
+            # Apply filters
+            if not engine.apply_filters():
+                log_message("Failed to apply filters")
+                return False
             
-        # Download Excel
-        if not processor.download_excel_rto(state_name, year, rto):
-            log_message("Failed to download Excel")
-            return False
+            # Download Excel
+            if not engine.download_excel_rto(state_name, year, rto):
+                log_message("Failed to download Excel")
+                return False
             
-        log_message(f"Successfully processed RTO: {rto}")
-        return True
+            log_message(f"Successfully processed RTO: {rto}",
+                        duration_ms=round((time.monotonic() - start_time) * 1000))
+            return True
         
-    except Exception as e:
-        log_message(f"Error in process_single_rto: {str(e)}")
-        return False
+        except Exception as e:
+            log_message(f"Error in process_single_rto: {str(e)}")
+            return False
 
 def recover_state(processor, state_name, year):
     """Recover the state by reinitializing the flow"""
-    try:
-        log_message("Attempting to recover state...")
-        
-        # Refresh the browser
-        processor.browser.driver.refresh()
-        
-        # Wait for page to load
-        WebDriverWait(processor.browser.driver, 30).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "[name='javax.faces.ViewState']"))
-        )
-        
-        # Reinitialize the flow
-        if not processor.setup_axis() or \
-           not processor.select_state_primefaces(state_name) or \
-           not processor.select_year(year):
-            log_message("Failed to reinitialize flow after refresh")
+    with log_context(state=state_name, year=str(year)):
+        try:
+            log_message("Attempting to recover state...")
+
+            # A 503 page needs a backoff before the refresh, not an immediate retry;
+            # handle_503_and_recover already refreshes the page and sets up the axis
+            if processor.check_for_503_error():
+                if not handle_503_and_recover(processor):
+                    return False
+            else:
+                # Refresh the browser
+                processor.browser.renavigate()
+                if processor.replay:
+                    processor.replay.invalidate()
+
+                # Wait for page to load
+                WebDriverWait(processor.browser.driver, 30).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, "[name='javax.faces.ViewState']"))
+                )
+
+                if not processor.setup_axis():
+                    log_message("Failed to set up axis after refresh")
+                    return False
+
+            # Reinitialize the flow
+            if not processor.select_state_primefaces(state_name) or not processor.select_year(year):
+                log_message("Failed to reinitialize flow after refresh")
+                return False
+
+            log_message("Successfully recovered state")
+            return True
+
+        except Exception as e:
+            log_message(f"Error in recover_state: {str(e)}")
             return False
-            
-        log_message("Successfully recovered state")
-        return True
-        
-    except Exception as e:
-        log_message(f"Error in recover_state: {str(e)}")
-        return False
 
 if __name__ == "__main__":
     main()
@@ -1,14 +1,34 @@
 from selenium import webdriver
+import os
 import random
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
 from configs import config
 from rto_processor.utils import *
+from rto_processor.profiling import profiler
+from rto_processor.session import resolve_driver_path
+
+# Bytes transferred and load time of the current document, from the performance API
+PAGE_METRICS_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var bytes = nav ? nav.transferSize : 0;
+for (var i = 0; i < resources.length; i++) { bytes += resources[i].transferSize || 0; }
+return {bytes: bytes, requests: resources.length + 1, load_ms: nav ? Math.round(nav.loadEventEnd - nav.startTime) : 0};
+"""
 
 class Browser:
-    def __init__(self):
+    def __init__(self, download_dir=None, profile=None):
+        self.download_dir = download_dir or config.BASE_DOWNLOAD_DIR
+        self.profile = profile
+        os.makedirs(self.download_dir, exist_ok=True)
         self.setup_driver()
-        self.load_page()
+        # Headless Chrome ignores the download.default_directory pref without this
+        self.update_download_directory(self.download_dir)
+        if config.BLOCK_RESOURCES and config.MEASURE_RESOURCE_BLOCKING:
+            self.measure_resource_blocking()
+        else:
+            self.load_page()
 
     
     def setup_driver(self):
@@ -19,10 +39,21 @@ class Browser:
             options.add_experimental_option(key, value)
 
         options.add_argument(f"--user-agent={random.choice(config.USER_AGENTS)}")
+
+        # Persistent profile per session keeps the site's static assets cached between runs
+        if config.BROWSER_PROFILE_DIR and self.profile:
+            user_data_dir = os.path.join(config.BROWSER_PROFILE_DIR, self.profile)
+            os.makedirs(user_data_dir, exist_ok=True)
+            options.add_argument(f"--user-data-dir={user_data_dir}")
         
-        options.add_experimental_option("prefs", config.PREFS)
+        prefs = dict(config.PREFS)
+        prefs["download.default_directory"] = self.download_dir
+        options.add_experimental_option("prefs", prefs)
 
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+        self.driver = webdriver.Chrome(service=Service(resolve_driver_path()), options=options)
+        profiler.instrument_driver(self.driver)
+        if config.BLOCK_RESOURCES:
+            self.set_blocked_urls(config.BLOCKED_URL_PATTERNS)
 
         # anti detection script
         self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
@@ -42,6 +73,64 @@ class Browser:
             log_message(f"Error loading page: {str(e)}")
             raise
 
+    def set_blocked_urls(self, patterns):
+        """Drop requests matching the wildcard patterns (images, fonts, analytics) via CDP"""
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+
+    def page_metrics(self):
+        return self.driver.execute_script(PAGE_METRICS_SCRIPT)
+
+    def measure_resource_blocking(self):
+        """
+        Load BASE_URL back to back without and with blocking, both with the
+        cache disabled so each load hits the network, and log what blocking
+        saves. Only this pair is compared: later loads use the profile cache
+        and would not be comparable with an uncached baseline.
+        """
+        self.driver.execute_cdp_cmd("Network.enable", {})
+        self.driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": True})
+        try:
+            self.set_blocked_urls([])
+            self.driver.get(config.BASE_URL)
+            baseline = self.page_metrics()
+            self.set_blocked_urls(config.BLOCKED_URL_PATTERNS)
+            self.driver.get(config.BASE_URL)
+            metrics = self.page_metrics()
+        finally:
+            self.driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": False})
+        log_message(f"Uncached page load without blocking: {baseline['bytes'] / 1024:.0f} KB, "
+                    f"{baseline['requests']} requests, {baseline['load_ms']} ms")
+        log_message(f"Uncached page load with blocking: {metrics['bytes'] / 1024:.0f} KB, "
+                    f"{metrics['requests']} requests, {metrics['load_ms']} ms "
+                    f"(saved {(baseline['bytes'] - metrics['bytes']) / 1024:.0f} KB, "
+                    f"{baseline['requests'] - metrics['requests']} requests, "
+                    f"{baseline['load_ms'] - metrics['load_ms']} ms)",
+                    bytes_saved=baseline['bytes'] - metrics['bytes'],
+                    ms_saved=baseline['load_ms'] - metrics['load_ms'])
+        return baseline, metrics
+
+    def is_alive(self):
+        """True while the Chrome session still answers WebDriver commands"""
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except WebDriverException:
+            return False
+
+    def renavigate(self):
+        """
+        Recover a broken JSF view: navigate the live session to BASE_URL for a
+        fresh view (assets come from the profile cache). Chrome is restarted
+        only when the session itself is gone.
+        """
+        if not self.is_alive():
+            log_message("Browser session lost, starting a new one")
+            self.close()
+            self.setup_driver()
+            self.update_download_directory(self.download_dir)
+        self.load_page()
+
     def update_download_directory(self, download_dir):
         """
         Update the download directory for the browser
@@ -50,9 +139,9 @@ class Browser:
             download_dir (str): Path to the new download directory
         """
         try:
-            # Update the config
-            config.BASE_DOWNLOAD_DIR = download_dir
-            
+            os.makedirs(download_dir, exist_ok=True)
+            self.download_dir = download_dir
+
             # Update Chrome preferences
             self.driver.execute_cdp_cmd(
                 'Page.setDownloadBehavior',
@@ -0,0 +1,107 @@
+import datetime
+import json
+import os
+import threading
+from configs import config
+from rto_processor.utils import log_message
+
+
+def state_key(state_name):
+    """'Tamil Nadu(148)' -> 'Tamil Nadu'; the count in the label changes when RTOs open"""
+    return state_name.split('(')[0].strip()
+
+
+class RTOCatalogue:
+    """
+    On-disk list of RTOs per state, so configure_state does not have to
+    open and scrape the RTO dropdown on every run. Entries older than
+    RTO_CATALOGUE_TTL_DAYS are refreshed from the page the next time the
+    state is configured, and the difference is logged.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or config.RTO_CATALOGUE_PATH
+        self.lock = threading.Lock()
+        self.states = None
+
+    def _load(self):
+        if self.states is None:
+            if os.path.exists(self.path):
+                with open(self.path) as f:
+                    self.states = json.load(f)
+            else:
+                self.states = {}
+        return self.states
+
+    def _save(self):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.states, f, indent=4, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def get(self, state_name):
+        """Cached RTO list for a state, or None"""
+        with self.lock:
+            entry = self._load().get(state_key(state_name))
+        return list(entry["rtos"]) if entry else None
+
+    def is_fresh(self, state_name):
+        with self.lock:
+            entry = self._load().get(state_key(state_name))
+        if not entry:
+            return False
+        updated_at = datetime.datetime.fromisoformat(entry["updated_at"])
+        return datetime.datetime.now() - updated_at < datetime.timedelta(days=config.RTO_CATALOGUE_TTL_DAYS)
+
+    def update(self, state_name, rto_list):
+        """Store a freshly scraped RTO list and return the diff against the cached one"""
+        with self.lock:
+            states = self._load()
+            key = state_key(state_name)
+            previous = states.get(key, {}).get("rtos", [])
+            diff = {
+                "added": [rto for rto in rto_list if rto not in previous],
+                "removed": [rto for rto in previous if rto not in rto_list],
+            }
+            states[key] = {
+                "rtos": list(rto_list),
+                "updated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+            self._save()
+
+        if previous and (diff["added"] or diff["removed"]):
+            log_message(f"RTO catalogue changes for {key}: "
+                        f"{len(diff['added'])} new, {len(diff['removed'])} closed")
+            for rto in diff["added"]:
+                log_message(f"  + {rto}")
+            for rto in diff["removed"]:
+                log_message(f"  - {rto}")
+        return diff
+
+    def workload(self, year_state_mapping):
+        """{(year, state): number of RTOs, or None when the state is not catalogued yet}"""
+        workload = {}
+        for year, states in year_state_mapping.items():
+            for state in states:
+                rtos = self.get(state)
+                workload[(year, state)] = len(rtos) if rtos is not None else None
+        return workload
+
+
+rto_catalogue = RTOCatalogue()
+
+
+def log_workload_plan(year_state_mapping, catalogue=rto_catalogue):
+    """Log the RTO count of every (year, state) before any browser is opened"""
+    workload = catalogue.workload(year_state_mapping)
+    known = {key: count for key, count in workload.items() if count is not None}
+    unknown = [key for key, count in workload.items() if count is None]
+    log_message(f"Planned workload: {sum(known.values())} RTOs across {len(known)} catalogued state-years")
+    if unknown:
+        log_message(f"Not in RTO catalogue yet: {', '.join(f'{state} ({year})' for year, state in unknown)}")
+    return workload
+
+
+if __name__ == "__main__":
+    for (year, state), count in log_workload_plan(config.YEAR_STATE_MAPPING).items():
+        print(f"{year}  {state:<35} {count if count is not None else '?'}")
@@ -0,0 +1,114 @@
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from configs import config
+from rto_processor.utils import log_message
+from rto_processor.profiling import profiler
+
+
+def backoff_delay(attempt, base=None, cap=None):
+    """Exponential backoff with equal jitter: between half and all of min(cap, base * 2 ** attempt)"""
+    base = config.BACKOFF_BASE if base is None else base
+    cap = config.BACKOFF_MAX if cap is None else cap
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def backoff_sleep(attempt, reason):
+    """Sleep one backoff step for a single session; recorded as a deliberate sleep"""
+    delay = backoff_delay(attempt)
+    log_message(f"{reason}: backing off {delay:.1f}s (attempt {attempt + 1})")
+    time.sleep(delay)
+    profiler.record("backoff", delay, "sleep")
+    return delay
+
+
+class CircuitBreaker:
+    """
+    Site-wide health shared by all workers.
+
+    A single failing session only backs itself off (backoff_sleep). When
+    CIRCUIT_FAILURE_THRESHOLD failures from any sessions fall within
+    CIRCUIT_FAILURE_WINDOW seconds the circuit opens: every worker waits in
+    wait_until_closed() before its next RTO, one of them probes BASE_URL
+    once the backoff has passed, and the circuit closes again as soon as
+    the probe succeeds. Each consecutive opening doubles the backoff.
+    """
+
+    def __init__(self, base_url=None):
+        self.base_url = base_url or config.BASE_URL
+        self.lock = threading.Lock()
+        self.failures = deque()
+        self.is_open = False
+        self.open_until = 0.0
+        self.open_count = 0
+        self.probing = False
+
+    def record_failure(self, reason=""):
+        now = time.monotonic()
+        with self.lock:
+            self.failures.append(now)
+            while self.failures and now - self.failures[0] > config.CIRCUIT_FAILURE_WINDOW:
+                self.failures.popleft()
+            if not self.is_open and len(self.failures) >= config.CIRCUIT_FAILURE_THRESHOLD:
+                self._open(reason)
+
+    def record_success(self):
+        with self.lock:
+            self.failures.clear()
+            if not self.is_open:
+                self.open_count = 0
+
+    def _open(self, reason):
+        delay = backoff_delay(self.open_count)
+        self.open_count += 1
+        self.is_open = True
+        self.open_until = time.monotonic() + delay
+        log_message(f"Circuit open ({reason or 'repeated failures'}): pausing all workers for {delay:.1f}s")
+
+    def probe(self):
+        """Cheap health check: any response below 500 from BASE_URL counts as healthy"""
+        request = urllib.request.Request(self.base_url, headers={"User-Agent": "Mozilla/5.0"})
+        try:
+            with urllib.request.urlopen(request, timeout=config.HEALTH_PROBE_TIMEOUT) as response:
+                return response.status < 500
+        except urllib.error.HTTPError as e:
+            return e.code < 500
+        except Exception:
+            return False
+
+    def wait_until_closed(self):
+        """Block while the circuit is open; returns the seconds waited"""
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                if not self.is_open:
+                    break
+                remaining = self.open_until - time.monotonic()
+                should_probe = remaining <= 0 and not self.probing
+                if should_probe:
+                    self.probing = True
+
+            if should_probe:
+                healthy = self.probe()
+                with self.lock:
+                    self.probing = False
+                    if healthy:
+                        self.is_open = False
+                        self.failures.clear()
+                        log_message("Health probe succeeded, circuit closed")
+                    else:
+                        self._open("health probe failed")
+            else:
+                time.sleep(min(max(remaining, 0.5), 1.0))
+
+        waited = time.monotonic() - start
+        if waited > 0.01:
+            profiler.record("circuit_open", waited, "sleep")
+        return waited
+
+
+circuit_breaker = CircuitBreaker()
@@ -0,0 +1,105 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+from configs import config
+from rto_processor.utils import log_message
+
+DOWNLOAD_EXTENSIONS = ('.xlsx', '.xls')
+TEMP_EXTENSIONS = ('.crdownload', '.part', '.tmp')
+
+
+class Inotify:
+    """Minimal inotify watch on one directory (Linux only)"""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout):
+        """Block until the directory changes or timeout expires; drains pending events"""
+        ready, _, _ = select.select([self.fd], [], [], max(timeout, 0))
+        if ready:
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+        return bool(ready)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DownloadWatcher:
+    """
+    Detects the file produced by a single export click.
+
+    arm() snapshots the directory right before the click; wait() returns the
+    first new xlsx that appears afterwards. Chrome writes to a .crdownload
+    file and renames it once complete, so a new file with its final name is
+    a finished download. Wakes up on inotify events where available and
+    falls back to short polling elsewhere.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.before = set()
+        self.inotify = None
+        if sys.platform.startswith("linux"):
+            try:
+                self.inotify = Inotify(directory)
+            except (OSError, AttributeError) as e:
+                log_message(f"inotify unavailable, polling {directory} instead: {str(e)}")
+
+    def _entries(self):
+        with os.scandir(self.directory) as entries:
+            return {entry.name for entry in entries if entry.is_file()}
+
+    def arm(self):
+        self.before = self._entries()
+
+    def _finished_download(self):
+        new_files = self._entries() - self.before
+        if any(name.lower().endswith(TEMP_EXTENSIONS) for name in new_files):
+            return None
+        done = [name for name in new_files if name.lower().endswith(DOWNLOAD_EXTENSIONS)]
+        if not done:
+            return None
+        if len(done) > 1:
+            done.sort(key=lambda name: os.path.getmtime(os.path.join(self.directory, name)), reverse=True)
+        return os.path.join(self.directory, done[0])
+
+    def wait(self, timeout=None):
+        """Return the path of the downloaded file, or None on timeout"""
+        timeout = timeout or config.DOWNLOAD_TIMEOUT
+        deadline = time.monotonic() + timeout
+        while True:
+            found_file = self._finished_download()
+            if found_file:
+                return found_file
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if self.inotify:
+                self.inotify.wait(remaining)
+            else:
+                time.sleep(min(config.DOWNLOAD_POLL_INTERVAL, remaining))
+
+    def close(self):
+        if self.inotify:
+            self.inotify.close()
+            self.inotify = None
@@ -0,0 +1,64 @@
+"""
+Read or change many page elements in one execute_script round-trip instead
+of one WebDriver call per element.
+"""
+
+CHECKBOX_STATES_SCRIPT = """
+var states = {};
+arguments[0].forEach(function (id) {
+    var el = document.getElementById(id);
+    states[id] = el === null ? null : el.checked;
+});
+return states;
+"""
+
+# Clicks the visible PrimeFaces box so the widget and the hidden input stay in sync
+CHECK_BOXES_SCRIPT = """
+var clicked = [];
+arguments[0].forEach(function (id) {
+    var el = document.getElementById(id);
+    if (el === null || el.checked) { return; }
+    var wrapper = el.closest('.ui-chkbox');
+    var box = wrapper ? wrapper.querySelector('.ui-chkbox-box') : null;
+    (box || el).click();
+    clicked.push(id);
+});
+return clicked;
+"""
+
+DROPDOWN_OPTIONS_SCRIPT = """
+var panel = document.getElementById(arguments[0]);
+if (panel === null) { return []; }
+return Array.prototype.map.call(panel.querySelectorAll('li'), function (li) {
+    return (li.innerText || li.textContent).trim();
+});
+"""
+
+ELEMENT_TEXTS_SCRIPT = """
+var texts = {};
+arguments[0].forEach(function (id) {
+    var el = document.getElementById(id);
+    texts[id] = el === null ? null : (el.innerText || el.textContent).trim();
+});
+return texts;
+"""
+
+
+def checkbox_states(driver, checkbox_ids):
+    """{id: True/False, or None if the checkbox is not on the page}"""
+    return driver.execute_script(CHECKBOX_STATES_SCRIPT, list(checkbox_ids))
+
+
+def check_boxes(driver, checkbox_ids):
+    """Tick every unticked checkbox of checkbox_ids; returns the ids that were clicked"""
+    return driver.execute_script(CHECK_BOXES_SCRIPT, list(checkbox_ids))
+
+
+def dropdown_options(driver, panel_id):
+    """Labels of all items of a PrimeFaces dropdown panel"""
+    return driver.execute_script(DROPDOWN_OPTIONS_SCRIPT, panel_id)
+
+
+def element_texts(driver, element_ids):
+    """{id: visible text} for several elements, e.g. the current dropdown selections"""
+    return driver.execute_script(ELEMENT_TEXTS_SCRIPT, list(element_ids))
@@ -0,0 +1,152 @@
+import datetime
+import hashlib
+import os
+import sqlite3
+import threading
+from configs import config
+from rto_processor.utils import log_message
+
+
+def file_sha256(file_path, chunk_size=1024 * 1024):
+    """Return the hex SHA-256 digest of a file"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ProgressLedger:
+    """
+    Durable progress ledger keyed by (year, state, RTO).
+
+    Every attempt, success and failure is written to SQLite straight away so
+    a restarted run can skip finished work without touching the browser.
+    One instance can be shared between worker threads.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or config.LEDGER_PATH
+        self.lock = threading.Lock()
+        # isolation_level=None -> autocommit, every write is durable on return
+        self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS rto_progress (
+                year TEXT NOT NULL,
+                state TEXT NOT NULL,
+                rto TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                output_path TEXT,
+                file_hash TEXT,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (year, state, rto)
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS state_progress (
+                year TEXT NOT NULL,
+                state TEXT NOT NULL,
+                rto_count INTEGER NOT NULL,
+                completed_at TEXT NOT NULL,
+                PRIMARY KEY (year, state)
+            )
+        """)
+
+    @staticmethod
+    def _now():
+        return datetime.datetime.now().isoformat(timespec='seconds')
+
+    def record_attempt(self, year, state, rto):
+        """Mark an RTO as in progress and bump its attempt counter"""
+        with self.lock:
+            self.conn.execute("""
+                INSERT INTO rto_progress (year, state, rto, status, attempts, updated_at)
+                VALUES (?, ?, ?, 'in_progress', 1, ?)
+                ON CONFLICT (year, state, rto) DO UPDATE SET
+                    status = 'in_progress', attempts = attempts + 1, updated_at = excluded.updated_at
+            """, (str(year), state, rto, self._now()))
+
+    def mark_done(self, year, state, rto, output_path):
+        """Record a finished RTO together with its output file and hash"""
+        file_hash = file_sha256(output_path)
+        with self.lock:
+            self.conn.execute("""
+                INSERT INTO rto_progress (year, state, rto, status, attempts, output_path, file_hash, updated_at)
+                VALUES (?, ?, ?, 'done', 0, ?, ?, ?)
+                ON CONFLICT (year, state, rto) DO UPDATE SET
+                    status = 'done', output_path = excluded.output_path,
+                    file_hash = excluded.file_hash, updated_at = excluded.updated_at
+            """, (str(year), state, rto, output_path, file_hash, self._now()))
+
+    def mark_failed(self, year, state, rto):
+        with self.lock:
+            self.conn.execute("""
+                INSERT INTO rto_progress (year, state, rto, status, attempts, updated_at)
+                VALUES (?, ?, ?, 'failed', 0, ?)
+                ON CONFLICT (year, state, rto) DO UPDATE SET
+                    status = 'failed', updated_at = excluded.updated_at
+            """, (str(year), state, rto, self._now()))
+
+    def is_done(self, year, state, rto):
+        """True if the RTO finished and its output file is still on disk"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT output_path FROM rto_progress WHERE year = ? AND state = ? AND rto = ? AND status = 'done'",
+                (str(year), state, rto)
+            ).fetchone()
+        return bool(row and row[0] and os.path.exists(row[0]))
+
+    def completed_rtos(self, year, state):
+        """Set of RTOs of a state that finished and still have their output file"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT rto, output_path FROM rto_progress WHERE year = ? AND state = ? AND status = 'done'",
+                (str(year), state)
+            ).fetchall()
+        return {rto for rto, output_path in rows if output_path and os.path.exists(output_path)}
+
+    def mark_state_done(self, year, state, rto_count):
+        with self.lock:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO state_progress (year, state, rto_count, completed_at)
+                VALUES (?, ?, ?, ?)
+            """, (str(year), state, rto_count, self._now()))
+        log_message(f"Ledger: {state} ({year}) complete with {rto_count} RTOs")
+
+    def is_state_done(self, year, state):
+        """True if every RTO of the state finished in an earlier run"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT rto_count FROM state_progress WHERE year = ? AND state = ?",
+                (str(year), state)
+            ).fetchone()
+        if not row:
+            return False
+        return len(self.completed_rtos(year, state)) >= row[0]
+
+    def reset(self, year, state=None):
+        """
+        Forget the progress of a year, or of one state in it, so the next run
+        downloads it again. Returns the number of RTO rows removed.
+        """
+        where, params = "year = ?", [str(year)]
+        if state is not None:
+            where += " AND state = ?"
+            params.append(state)
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                removed = self.conn.execute(f"DELETE FROM rto_progress WHERE {where}", params).rowcount
+                self.conn.execute(f"DELETE FROM state_progress WHERE {where}", params)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        log_message(f"Ledger: reset {state or 'all states'} ({year}), {removed} RTOs removed")
+        return removed
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,76 @@
+import time
+from collections import defaultdict, deque
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+from configs import config
+from rto_processor.utils import log_message, random_delay
+from rto_processor.profiling import profiler
+
+# True once the document is loaded, the PrimeFaces AJAX queue is empty and
+# no blockUI overlay is visible
+READY_SCRIPT = """
+if (document.readyState !== 'complete') { return false; }
+var pf = window.PrimeFaces;
+if (pf && pf.ajax && pf.ajax.Queue && !pf.ajax.Queue.isEmpty()) { return false; }
+if (window.jQuery && jQuery.active > 0) { return false; }
+var overlays = document.querySelectorAll('.ui-blockui, .ui-blockui-content, .ui-widget-overlay');
+for (var i = 0; i < overlays.length; i++) {
+    if (overlays[i].offsetParent !== null) { return false; }
+}
+return true;
+"""
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class Pacer:
+    """
+    Replaces fixed random_delay ranges with waits on real readiness signals.
+
+    settle(step) returns as soon as the page is idle (see READY_SCRIPT) and
+    then sleeps only the configured POLITENESS_DELAY. The time each step
+    took to become ready is kept per step; once enough samples exist the
+    wait timeout follows the observed p99 instead of a worst-case constant.
+    """
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.latencies = defaultdict(lambda: deque(maxlen=config.PACING_HISTORY))
+
+    def timeout_for(self, step):
+        samples = self.latencies[step]
+        if len(samples) < config.PACING_MIN_SAMPLES:
+            return config.PACING_DEFAULT_TIMEOUT
+        learned = percentile(samples, 0.99) * config.PACING_TIMEOUT_FACTOR
+        return min(config.PACING_DEFAULT_TIMEOUT, max(config.PACING_MIN_TIMEOUT, learned))
+
+    def is_ready(self):
+        try:
+            return bool(self.browser.driver.execute_script(READY_SCRIPT))
+        except WebDriverException:
+            return False
+
+    def settle(self, step):
+        """Wait until the page is idle after `step`, then apply the politeness budget"""
+        start = time.monotonic()
+        timeout = self.timeout_for(step)
+        try:
+            WebDriverWait(self.browser.driver, timeout, poll_frequency=config.PACING_POLL_INTERVAL).until(
+                lambda driver: self.is_ready()
+            )
+        except TimeoutException:
+            log_message(f"Page not idle {timeout:.1f}s after {step}, continuing")
+        waited = time.monotonic() - start
+        self.latencies[step].append(waited)
+        profiler.record(step, waited, "wait")
+
+        # Politeness pause, recorded by random_delay as a deliberate sleep
+        random_delay(*config.POLITENESS_DELAY)
+        return time.monotonic() - start
@@ -0,0 +1,152 @@
+import os
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from configs import config
+from rto_processor.utils import log_message
+
+
+class DownloadPipeline:
+    """
+    Runs the stages after a download while the browser moves on.
+
+    Every finished download is an event on a bounded queue (the scraper
+    blocks only when PIPELINE_MAX_PENDING events are waiting). A dispatcher
+    thread hands them to a process pool running scripts.clean_data.clean_job,
+    keeping at most two jobs per worker in flight, and every cleaned file is
+    passed on to the S3 uploader when uploads are enabled. One progress line
+    covers all stages, and the cleaning results are written to the same
+    manifest format clean_data uses so a later clean_corpus run skips them.
+    """
+
+    def __init__(self, output_base_path=None, output_format=None, workers=None, max_pending=None, uploader=None):
+        from scripts import clean_data
+
+        self.clean_data = clean_data
+        self.output_base_path = output_base_path or config.PIPELINE_CLEAN_DIR
+        self.output_format = output_format or config.PIPELINE_CLEAN_FORMAT
+        self.workers = workers or config.PIPELINE_CLEAN_WORKERS or os.cpu_count() or 1
+        self.uploader = uploader
+        self.events = queue.Queue(maxsize=max_pending or config.PIPELINE_MAX_PENDING)
+        self.in_flight = threading.BoundedSemaphore(self.workers * 2)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.results = []
+        self.stopped = threading.Event()
+        self.dispatcher = threading.Thread(target=self._dispatch, name="pipeline-dispatch", daemon=True)
+        self.reporter = threading.Thread(target=self._report_progress, name="pipeline-progress", daemon=True)
+
+    def start(self):
+        self.dispatcher.start()
+        self.reporter.start()
+        log_message(f"Download pipeline started: {self.workers} cleaning workers, output {self.output_base_path}")
+        return self
+
+    def submit(self, download_path, year):
+        """Queue a finished download; blocks while the pipeline is PIPELINE_MAX_PENDING behind"""
+        self._count("downloaded")
+        self.events.put((download_path, str(year)))
+
+    def job_for(self, download_path, year):
+        """clean_data job tuple for a download at BASE_DOWNLOAD_DIR/<year>/<state>/<rto>.xlsx"""
+        # Absolute, like clean_data.collect_jobs, so both write the same manifest keys
+        download_path = os.path.abspath(download_path)
+        state_folder = os.path.basename(os.path.dirname(download_path))
+        rto_name = os.path.splitext(os.path.basename(download_path))[0]
+        output_path = self.clean_data.cleaned_output_path(os.path.abspath(self.output_base_path), year,
+                                                          state_folder, rto_name, self.output_format)
+        return (download_path, output_path, self.clean_data.months_for_year(year), self.output_format, rto_name)
+
+    def _dispatch(self):
+        while True:
+            event = self.events.get()
+            if event is None:
+                return
+            self.in_flight.acquire()
+            self._count("cleaning")
+            future = self.executor.submit(self.clean_data.clean_job, self.job_for(*event))
+            future.add_done_callback(self._cleaned)
+
+    def _cleaned(self, future):
+        self.in_flight.release()
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {"status": "failed", "error": str(e), "output": None}
+        with self.lock:
+            self.counts["cleaning"] -= 1
+            self.counts["cleaned" if result["status"] == "ok" else "clean_failed"] += 1
+            self.results.append(result)
+        if result["status"] != "ok":
+            log_message(f"Cleaning failed for {result.get('source')}: {result['error']}")
+        elif self.uploader:
+            relative_path = os.path.relpath(result["output"], self.output_base_path).replace(os.sep, "/")
+            self.uploader.submit(result["output"], config.PIPELINE_S3_PREFIX + relative_path)
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.counts[key] += amount
+
+    def progress(self):
+        with self.lock:
+            counts = dict(self.counts)
+        line = (f"Pipeline: downloaded {counts.get('downloaded', 0)} | waiting {self.events.qsize()} | "
+                f"cleaning {counts.get('cleaning', 0)} | cleaned {counts.get('cleaned', 0)} "
+                f"({counts.get('clean_failed', 0)} failed)")
+        if self.uploader:
+            stats = dict(self.uploader.stats)
+            line += (f" | upload queue {self.uploader.queue.qsize()}, uploaded {stats['uploaded']}, "
+                     f"skipped {stats['skipped']}, failed {stats['failed']}")
+        return line
+
+    def _report_progress(self):
+        last = None
+        while not self.stopped.wait(config.PIPELINE_PROGRESS_INTERVAL):
+            line = self.progress()
+            if line != last:
+                log_message(line)
+                last = line
+
+    def close(self):
+        """Finish queued cleaning, write the manifest and stop the threads"""
+        self.events.put(None)
+        self.dispatcher.join()
+        self.executor.shutdown(wait=True)
+        self.stopped.set()
+        self.reporter.join()
+
+        if self.results:
+            os.makedirs(self.output_base_path, exist_ok=True)
+            manifest_path = os.path.join(self.output_base_path, "manifest.json")
+            previous = self.clean_data.load_manifest(manifest_path)
+            for result in self.results:
+                if result.get("output"):
+                    previous[result["output"]] = result
+            self.clean_data.write_manifest(list(previous.values()), manifest_path)
+        log_message(self.progress())
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """The shared, started pipeline when PIPELINE_ENABLED, otherwise None"""
+    global _pipeline
+    if not config.PIPELINE_ENABLED:
+        return None
+    with _pipeline_lock:
+        if _pipeline is None:
+            from rto_processor.uploader import get_uploader
+            _pipeline = DownloadPipeline(uploader=get_uploader()).start()
+        return _pipeline
+
+
+def close_pipeline():
+    global _pipeline
+    with _pipeline_lock:
+        pipeline, _pipeline = _pipeline, None
+    if pipeline is not None:
+        pipeline.close()
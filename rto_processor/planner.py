@@ -0,0 +1,177 @@
+import glob
+import heapq
+import json
+import os
+import re
+from collections import defaultdict, namedtuple
+from configs import config
+from rto_processor.catalogue import rto_catalogue, state_key
+from rto_processor.utils import log_message
+
+# rtos is the list of RTO names of the chunk, or None for "every RTO of the state"
+# when the state is not in the catalogue yet; cost is in seconds
+PlannedTask = namedtuple("PlannedTask", ["year", "state", "rtos", "cost"])
+
+# Top-level profiler steps run once per RTO and once per state configuration
+RTO_STEPS = ("select_specific_rto", "apply_filters", "download_excel_rto",
+             "replay.select_specific_rto", "replay.apply_filters", "replay.download_excel_rto")
+EXPORT_STEPS = ("download_excel_rto", "replay.download_excel_rto")
+SETUP_STEPS = ("setup_axis", "select_state_primefaces", "select_year", "get_all_rtos_for_state",
+               "replay.capture_session")
+
+STATE_COUNT_RE = re.compile(r"\((\d+)\)\s*$")
+
+
+class CostModel:
+    """
+    Seconds per RTO and per state setup, learned from the perf_*.json
+    reports in PERF_REPORT_DIR. States with their own history use their own
+    per-RTO time; everything else falls back to the average over all
+    reports, or to PLANNER_DEFAULT_* when there are no reports at all.
+    """
+
+    def __init__(self, report_dir=None):
+        self.rto_seconds = config.PLANNER_DEFAULT_RTO_SECONDS
+        self.setup_seconds = config.PLANNER_DEFAULT_SETUP_SECONDS
+        self.state_rto_seconds = {}
+        self.load(report_dir or config.PERF_REPORT_DIR)
+
+    @staticmethod
+    def per_rto(steps):
+        """Seconds per exported RTO in a {step: summary} table, or None"""
+        exports = sum(steps[name]["count"] for name in EXPORT_STEPS if name in steps)
+        if not exports:
+            return None
+        return sum(steps[name]["total_ms"] for name in RTO_STEPS if name in steps) / 1000 / exports
+
+    def load(self, report_dir):
+        totals = defaultdict(lambda: [0.0, 0])
+        setup = [0.0, 0]
+        for path in sorted(glob.glob(os.path.join(report_dir, "perf_*.json"))):
+            try:
+                with open(path) as f:
+                    report = json.load(f)
+            except (OSError, ValueError) as e:
+                log_message(f"Skipping perf report {path}: {str(e)}")
+                continue
+            for state, steps in report.get("per_state", {}).items():
+                seconds = self.per_rto(steps)
+                if seconds is not None:
+                    exports = sum(steps[name]["count"] for name in EXPORT_STEPS if name in steps)
+                    totals[state_key(state)][0] += seconds * exports
+                    totals[state_key(state)][1] += exports
+            steps = report.get("steps", {})
+            if "setup_axis" in steps:
+                setup[0] += sum(steps[name]["total_ms"] for name in SETUP_STEPS if name in steps) / 1000
+                setup[1] += steps["setup_axis"]["count"]
+
+        if totals:
+            self.state_rto_seconds = {state: total / count for state, (total, count) in totals.items()}
+            self.rto_seconds = (sum(total for total, _ in totals.values())
+                                / sum(count for _, count in totals.values()))
+        if setup[1]:
+            self.setup_seconds = setup[0] / setup[1]
+
+    def rto_cost(self, state):
+        return self.state_rto_seconds.get(state_key(state), self.rto_seconds)
+
+    def task_cost(self, state, rto_count):
+        return self.setup_seconds + rto_count * self.rto_cost(state)
+
+
+def expected_rto_count(state_name):
+    """RTO count from the dropdown label, 'Tamil Nadu(148)' -> 148"""
+    match = STATE_COUNT_RE.search(state_name)
+    return int(match.group(1)) if match else 1
+
+
+def build_tasks(year_state_mapping, ledger=None, catalogue=rto_catalogue, cost_model=None, chunk_size=None):
+    """
+    Pending work as PlannedTasks: RTOs the ledger has finished are left out
+    and states with more than chunk_size pending RTOs are split into chunks,
+    each paying the state setup once, so one big state cannot hold up a shard.
+    """
+    cost_model = cost_model or CostModel()
+    chunk_size = chunk_size or config.PLANNER_CHUNK_SIZE
+    tasks = []
+    for year, states in year_state_mapping.items():
+        for state in states:
+            if ledger and ledger.is_state_done(year, state):
+                continue
+            rtos = catalogue.get(state)
+            if rtos is None:
+                tasks.append(PlannedTask(str(year), state, None,
+                                         cost_model.task_cost(state, expected_rto_count(state))))
+                continue
+            done = ledger.completed_rtos(year, state) if ledger else set()
+            pending = [rto for rto in rtos if rto not in done]
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                tasks.append(PlannedTask(str(year), state, chunk, cost_model.task_cost(state, len(chunk))))
+    return tasks
+
+
+def shard_tasks(tasks, shard_count):
+    """
+    Longest-processing-time-first: hand the most expensive remaining task to
+    the least loaded shard. Returns shard_count lists of tasks, each in
+    descending cost order.
+    """
+    shards = [[] for _ in range(shard_count)]
+    loads = [(0.0, index) for index in range(shard_count)]
+    heapq.heapify(loads)
+    for task in sorted(tasks, key=lambda task: task.cost, reverse=True):
+        load, index = heapq.heappop(loads)
+        shards[index].append(task)
+        heapq.heappush(loads, (load + task.cost, index))
+    return shards
+
+
+def write_plan(shards, path):
+    plan = {
+        "shards": [
+            {
+                "shard": index,
+                "cost_s": round(sum(task.cost for task in shard), 1),
+                "tasks": [task._asdict() for task in shard],
+            }
+            for index, shard in enumerate(shards)
+        ],
+    }
+    with open(path, "w") as f:
+        json.dump(plan, f, indent=4)
+    return plan
+
+
+def load_plan_shard(path, shard_index):
+    """PlannedTasks of one shard of a plan file"""
+    with open(path) as f:
+        plan = json.load(f)
+    shard_count = len(plan["shards"])
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Shard {shard_index} is not in {path}, which has shards 0 to {shard_count - 1}")
+    return [PlannedTask(**task) for task in plan["shards"][shard_index]["tasks"]]
+
+
+def mark_state_if_complete(ledger, year, state, catalogue=rto_catalogue):
+    """
+    Mark a state done in the ledger once every catalogue RTO of it is, so a
+    state planned as several chunks is skipped as a whole by the next plan.
+    Returns True when the state is complete.
+    """
+    rtos = catalogue.get(state)
+    if not rtos or not set(rtos) <= ledger.completed_rtos(year, state):
+        return False
+    ledger.mark_state_done(year, state, len(rtos))
+    return True
+
+
+def log_plan(shards):
+    loads = [sum(task.cost for task in shard) for shard in shards]
+    average = sum(loads) / len(loads) if loads else 0
+    log_message(f"Plan: {sum(len(shard) for shard in shards)} tasks in {len(shards)} shards, "
+                f"average {average / 60:.1f} min, slowest {max(loads, default=0) / 60:.1f} min")
+    for index, shard in enumerate(shards):
+        log_message(f"  shard {index}: {len(shard)} tasks, "
+                    f"{sum(len(task.rtos) if task.rtos else expected_rto_count(task.state) for task in shard)} RTOs, "
+                    f"{loads[index] / 60:.1f} min")
@@ -4,8 +4,12 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import TimeoutException, StaleElementReferenceException, WebDriverException, NoSuchElementException
 from configs import config
-from rto_processor.utils import log_message, random_delay, setup_directories
-import time
+from rto_processor.utils import log_message, setup_directories
+from rto_processor.downloads import DownloadWatcher
+from rto_processor.pacing import Pacer
+from rto_processor import js_bridge
+from rto_processor.profiling import profiler
+from rto_processor.circuit import circuit_breaker, backoff_sleep
 import os
 import re
 import shutil
@@ -17,8 +21,43 @@ logger = logging.getLogger(__name__)
 class RTOProcessor:
     def __init__(self, browser):
         self.browser = browser
+        self.pacer = Pacer(browser)
+        # Path of the file moved into place by the last successful download
+        self.last_download_path = None
+        # JSFReplayEngine bound to this session when config.ENGINE == "replay"
+        self.replay = None
+        self.download_watcher = None
+        # Filter key last applied through the left panel; None forces a re-apply
+        self.applied_filters = None
+        # Year currently chosen in the year dropdown
+        self.selected_year = None
+        # 503 pages seen since this session last exported an RTO; drives its backoff
+        self.consecutive_503s = 0
         setup_directories()
 
+    @staticmethod
+    def sanitize_filename(filename):
+        # Replace any character not in the allowed set with an underscore
+        # Allowed: alphanumeric, spaces, dots, hyphens, and underscores
+        return re.sub(r'[\\/*?:"<>|]', "_", filename)
+
+    def get_download_watcher(self):
+        """Watcher for the browser's current download directory"""
+        download_dir = self.browser.download_dir
+        if self.download_watcher is None or self.download_watcher.directory != download_dir:
+            if self.download_watcher:
+                self.download_watcher.close()
+            os.makedirs(download_dir, exist_ok=True)
+            self.download_watcher = DownloadWatcher(download_dir)
+        return self.download_watcher
+
+    def get_output_path(self, state_name, year, rto_name):
+        """Final location of an RTO export: base_dir/year/state_name/rto_name.xlsx"""
+        safe_rto_name = re.sub(r'\s*\(\d{2}-[A-Z]{3}-\d{4}\)\s*$', '', rto_name).strip()
+        target_dir = os.path.join(config.BASE_DOWNLOAD_DIR, str(year), state_name)
+        return os.path.join(target_dir, f"{self.sanitize_filename(safe_rto_name)}.xlsx")
+
+    @profiler.step()
     def setup_axis(self):
         try:
             log_message("Setting up X-axis (Month Wise) and Y-axis (Maker)...")
@@ -34,7 +73,7 @@ class RTOProcessor:
                 return False
                 
             self.smart_click(y_axis_label, "Y-axis dropdown")
-            random_delay(0.5, 1)
+            self.pacer.settle("open y-axis dropdown")
             
             maker_option = self.wait_and_scroll_to_element(By.XPATH, "//li[@data-label='Maker']", 10, "Maker option")
             if maker_option:
@@ -43,7 +82,7 @@ class RTOProcessor:
                 # Try JavaScript fallback
                 self.browser.driver.execute_script("PrimeFaces.widgets.widget_yaxisVar.selectValue('4');")
                 log_message("Used JavaScript to select Maker for Y-axis")
-            random_delay(0.5, 1)
+            self.pacer.settle("select y-axis")
             
             # Select X-axis (Month Wise)
             x_axis_label = self.wait_and_scroll_to_element(By.ID, config.X_AXIS_LABEL, 20, "X-axis dropdown")
@@ -52,7 +91,7 @@ class RTOProcessor:
                 return False
                 
             self.smart_click(x_axis_label, "X-axis dropdown")
-            random_delay(0.5, 1)
+            self.pacer.settle("open x-axis dropdown")
             
             month_wise_option = self.wait_and_scroll_to_element(By.XPATH, "//li[@data-label='Month Wise']", 10, "Month Wise option")
             if month_wise_option:
@@ -61,7 +100,7 @@ class RTOProcessor:
                 # Try JavaScript fallback
                 self.browser.driver.execute_script("PrimeFaces.widgets.widget_xaxisVar.selectValue('6');")
                 log_message("Used JavaScript to select Month Wise for X-axis")
-            random_delay(0.5, 1)
+            self.pacer.settle("select x-axis")
             
             log_message("Axis setup completed")
             return True
@@ -75,12 +114,13 @@ class RTOProcessor:
                 EC.presence_of_element_located((locator_type, locator_value))
             )
             self.browser.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
-            random_delay(0.2, 0.5)
+            self.pacer.settle("scroll")
             return element
         except Exception as e:
             log_message(f"Failed to find {name}: {str(e)}")
             return None
 
+    @profiler.step()
     def get_all_rtos_for_state(self):
         """Get list of all RTOs for the currently selected state"""
         try:
@@ -92,16 +132,15 @@ class RTOProcessor:
                 return []
             
             self.smart_click(rto_dropdown_label, "RTO dropdown label")
-            random_delay(0.5, 1)
+            self.pacer.settle("open RTO dropdown")
             
-            # Find all RTO options
-            rto_options = self.browser.driver.find_elements(By.XPATH, "//div[@id='selectedRto_panel']//li")
+            # Read all RTO labels in one script call
+            rto_options = js_bridge.dropdown_options(self.browser.driver, "selectedRto_panel")
             
-            rto_list = []
-            for option in rto_options:
-                rto_text = option.text.strip()
-                if rto_text and "All Vahan4 Running Office" not in rto_text:
-                    rto_list.append(rto_text)
+            rto_list = [
+                rto_text for rto_text in rto_options
+                if rto_text and "All Vahan4 Running Office" not in rto_text
+            ]
             
             # Close dropdown by clicking outside
             self.browser.driver.find_element(By.TAG_NAME, "body").click()
@@ -112,6 +151,7 @@ class RTOProcessor:
             log_message(f"Error in get_all_rtos_for_state: {str(e)}")
             return []
 
+    @profiler.step()
     def select_specific_rto(self, rto_name, state_name, year):
         """
         Select a specific RTO from dropdown
@@ -127,7 +167,7 @@ class RTOProcessor:
                 return False
             
             self.smart_click(rto_dropdown_label, "RTO dropdown")
-            random_delay(0.5, 1)
+            self.pacer.settle("open RTO dropdown")
             
             # Find and click specific RTO
             rto_xpath = f"//li[normalize-space(text())='{rto_name}']"
@@ -140,8 +180,7 @@ class RTOProcessor:
             self.smart_click(rto_option, f"RTO option: {rto_name}")
             
             # Verify selection
-            selected_rto = self.wait_and_find_element(By.ID, "selectedRto_label", 5, "selected RTO text")
-            if not selected_rto or rto_name not in selected_rto.text:
+            if not self.is_rto_selected(rto_name):
                 log_message("RTO selection verification failed")
                 return False
                 
@@ -153,6 +192,11 @@ class RTOProcessor:
             return False
 
 
+    def is_rto_selected(self, rto_name):
+        """True if the RTO dropdown still shows rto_name"""
+        selected_rto = js_bridge.element_texts(self.browser.driver, ["selectedRto_label"])["selectedRto_label"]
+        return bool(selected_rto) and rto_name in selected_rto
+
     def smart_click(self, element, element_name="element"):
         """Try multiple click methods until one works"""
         methods = [
@@ -173,7 +217,7 @@ class RTOProcessor:
                 continue
         return False
 
-    def wait_and_scroll_to_element(self, locator_type, locator_value, timeout=10, name="element"):
+    def wait_and_scroll_to_element(self, locator_type, locator_value, timeout=10, name="element", attempt=0):
         try:
             # First try with regular wait
             try:
@@ -192,8 +236,8 @@ class RTOProcessor:
                 try:
                     error_message = self.browser.driver.find_element(By.XPATH, "//span[contains(text(), 'session')]")
                     if error_message and "session" in error_message.text.lower():
-                        log_message("Session timeout detected, refreshing page...")
-                        self.browser.driver.refresh()
+                        log_message("Session timeout detected, reloading page...")
+                        self.browser.renavigate()
                         WebDriverWait(self.browser.driver, 30).until(
                             EC.presence_of_element_located((By.CSS_SELECTOR, "[name='javax.faces.ViewState']"))
                         )
@@ -210,7 +254,7 @@ class RTOProcessor:
             # Once we have the element, scroll to it
             try:
                 self.browser.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
-                random_delay(0.2, 0.5)
+                self.pacer.settle("scroll")
             except Exception as e:
                 log_message(f"Warning: Could not scroll to {name}: {str(e)}")
             
@@ -219,16 +263,19 @@ class RTOProcessor:
             if "not reachable" in str(e) or "connection" in str(e).lower() or "timeout" in str(e).lower():
                 log_message(f"Connection error or timeout when finding {name}: {str(e)}")
                 # Check if it's a timeout issue from the website
+                if attempt + 1 >= config.BACKOFF_MAX_ATTEMPTS:
+                    log_message(f"Giving up on {name} after {attempt + 1} attempts")
+                    return None
                 if "timeout" in str(e).lower():
-                    log_message("Website timeout detected. Waiting for 15 minutes before retrying...")
-                    time.sleep(900)  # Wait for 15 minutes (900 seconds)
-                    log_message("Resuming after 15-minute wait")
+                    circuit_breaker.record_failure("website timeout")
+                    backoff_sleep(attempt, "Website timeout detected")
+                    circuit_breaker.wait_until_closed()
                 
                 # Try to recover by refreshing
                 try:
-                    self.browser.driver.refresh()
-                    log_message("Page refreshed after connection error or timeout")
-                    return self.wait_and_scroll_to_element(locator_type, locator_value, timeout, name)
+                    self.browser.renavigate()
+                    log_message("Page reloaded after connection error or timeout")
+                    return self.wait_and_scroll_to_element(locator_type, locator_value, timeout, name, attempt + 1)
                 except:
                     log_message("Failed to recover from connection error or timeout")
                     return None
@@ -239,6 +286,7 @@ class RTOProcessor:
             log_message(f"Failed to find {name} ({locator_type}:{locator_value}): {str(e)}")
             return None
 
+    @profiler.step()
     def select_year(self, year):
         """Select year from dropdown"""
         try:
@@ -249,11 +297,13 @@ class RTOProcessor:
                 return False
             
             self.smart_click(year_dropdown, "year dropdown")
-            random_delay(0.5, 1)
+            self.pacer.settle("open year dropdown")
             
             year_option = self.wait_and_find_element(By.XPATH, f"//li[text()='{year}']", 10, f"year option: {year}")
             if year_option:
                 self.smart_click(year_option, f"year option: {year}")
+                self.pacer.settle("select year")
+                self.selected_year = str(year)
                 log_message(f"Successfully selected year: {year}")
                 return True
             return False
@@ -261,9 +311,12 @@ class RTOProcessor:
             log_message(f"Error selecting year: {str(e)}")
             return False
 
+    @profiler.step()
     def select_state_primefaces(self, state_name):
         try:
             log_message(f"Selecting State: {state_name}")
+            # Filters have to be applied again for a new state session
+            self.applied_filters = None
         
             # First find and click the state dropdown label to open the dropdown
             state_dropdown_label = self.wait_and_scroll_to_element(By.ID, config.STATE_DROPDOWN_LABEL, 20, "state dropdown label")
@@ -276,7 +329,7 @@ class RTOProcessor:
             
             self.smart_click(state_dropdown_label, "state dropdown label")
             
-            random_delay(0.5, 1)
+            self.pacer.settle("open state dropdown")
             
             # Extract the base name of the state (without numbers)
             state_base_name = state_name.split('(')[0].strip()
@@ -299,7 +352,7 @@ class RTOProcessor:
                 try:
                     state_option = method()
                     self.smart_click(state_option, f"state option: {state_name}")
-                    random_delay(0.5, 1)
+                    self.pacer.settle("select state")
                     
                     # Verify selection was successful
                     current_selection = self.browser.driver.find_element(By.ID, config.STATE_DROPDOWN_LABEL).text
@@ -327,7 +380,7 @@ class RTOProcessor:
             if "ui-layout-toggler-closed" in panel_class or "layout-toggler-collapsed" in panel_class:
                 self.smart_click(toggler, "left panel toggler")
                 log_message("Expanded left panel")
-                random_delay(0.5, 1)
+                self.pacer.settle("open left panel")
             else:
                 log_message("Left panel already open")
             
@@ -345,7 +398,7 @@ class RTOProcessor:
             )
             if collapse_button.is_displayed():
                 collapse_button.click()
-                random_delay(0.5, 1.5)  # Small delay to allow UI to collapse
+                self.pacer.settle("close left panel")
                 log_message("Left panel collapsed successfully.")
             else:
                 log_message("Collapse button not visible; panel might already be closed.")
@@ -358,27 +411,26 @@ class RTOProcessor:
         try:
             log_message("Selecting vehicle categories and fuel types")
             
-            # Select Vehicle Categories: TWO WHEELER
-            for idx in [0, 1, 2]:  # Indices for TWO WHEELER categories
-                try:
-                    checkbox_id = f"VhCatg:{idx}"
-                    checkbox = self.wait_and_scroll_to_element(By.ID, checkbox_id, 5, f"checkbox {checkbox_id}")
-                    if checkbox and not checkbox.is_selected():
-                        self.smart_click(checkbox, f"checkbox {checkbox_id}")
-                        random_delay(0.2, 0.5)
-                except Exception as e:
-                    log_message(f"Error selecting checkbox VhCatg:{idx}: {str(e)}")
-            
-            
-            for idx in config.FUEL_TYPES:
+            checkbox_ids = self.get_filter_checkbox_ids()
+            if not self.wait_and_scroll_to_element(By.ID, checkbox_ids[0], 5, f"checkbox {checkbox_ids[0]}"):
+                log_message("Filter checkboxes not found")
+                return False
+
+            # Tick all Vehicle Categories (TWO WHEELER) and fuel types in one call
+            clicked = js_bridge.check_boxes(self.browser.driver, checkbox_ids)
+            if clicked:
+                self.pacer.settle("filter checkboxes")
+
+            # Fall back to clicking one by one for anything still unticked
+            states = js_bridge.checkbox_states(self.browser.driver, checkbox_ids)
+            for checkbox_id in [cid for cid, checked in states.items() if checked is False]:
                 try:
-                    checkbox_id = f"fuel:{idx}"
                     checkbox = self.wait_and_scroll_to_element(By.ID, checkbox_id, 5, f"checkbox {checkbox_id}")
                     if checkbox and not checkbox.is_selected():
                         self.smart_click(checkbox, f"checkbox {checkbox_id}")
-                        random_delay(0.2, 0.5)
+                        self.pacer.settle("filter checkbox")
                 except Exception as e:
-                    log_message(f"Error selecting checkbox fuel:{idx}: {str(e)}")
+                    log_message(f"Error selecting checkbox {checkbox_id}: {str(e)}")
             
             log_message("Vehicle categories and fuel types selected")
             return True
@@ -403,6 +455,7 @@ class RTOProcessor:
             log_message(f"Error in click_left_refresh: {str(e)}")
             return False
 
+    @profiler.step()
     def download_excel_rto(self, state_name, year, rto_name):
         try:
             log_message(f"Downloading Excel file for {state_name}, {rto_name}, {year}")
@@ -430,6 +483,9 @@ class RTOProcessor:
             # Update preferences for download directory - safer method than CDP
             # old_prefs = self.driver.execute_script('return window.navigator.userAgent;')
             
+            # Snapshot the download directory so only this click's file is picked up
+            self.get_download_watcher().arm()
+
             # Click the download button
             self.smart_click(excel_button, "Excel download button")
             log_message("Clicked Excel download button")
@@ -439,8 +495,7 @@ class RTOProcessor:
             safe_rto_name = re.sub(r'\s*\(\d{2}-[A-Z]{3}-\d{4}\)\s*$', '', rto_name).strip()
             
             # Create year-wise directory structure: base_dir/year/state_name
-            target_dir = os.path.join(config.BASE_DOWNLOAD_DIR, state_name)
-            random_delay(3, 4)
+            target_dir = os.path.dirname(self.get_output_path(state_name, year, rto_name))
             os.makedirs(target_dir, exist_ok=True)
             
             # Call wait_for_download_and_rename with the year parameter
@@ -455,6 +510,7 @@ class RTOProcessor:
 
     
             
+    @profiler.step()
     def wait_for_download_and_rename(self, target_dir, state_name, rto_name):
         """
         Wait for download to complete, rename file, and upload to S3
@@ -469,50 +525,18 @@ class RTOProcessor:
             bool: True if successful, False otherwise
         """
         try:
-            log_message(f"BASE_DOWNLOAD_DIR being checked: {config.BASE_DOWNLOAD_DIR}")
-            log_message(f"Inside_wait_for_download_and_rename for {state_name}")
-            
-            # Ensure the base download directory exists
-            if not os.path.exists(config.BASE_DOWNLOAD_DIR):
-                log_message(f"Creating base download directory: {config.BASE_DOWNLOAD_DIR}")
-                os.makedirs(config.BASE_DOWNLOAD_DIR, exist_ok=True)
-            
-            found_file = None
-            timeout = 60  # 60 second timeout for download
-            start_time = time.time()
-            temp_file_pattern = re.compile(r'^.*\.(crdownload|part|tmp)$', re.IGNORECASE)
-    
-            # Wait for download to complete
-            while time.time() - start_time < timeout:
-                current_files = os.listdir(config.BASE_DOWNLOAD_DIR)
-                # log_message(f"Current files in BASE_DOWNLOAD_DIR: {current_files}")
-                
-                if any(f.endswith('.crdownload') for f in current_files):
-                    time.sleep(1)
-                    continue  # still downloading
-
-                valid_files = [f for f in current_files if f.lower().endswith(('.xlsx', '.xls'))]
-                if valid_files:
-                    valid_files.sort(key=lambda f: os.path.getmtime(os.path.join(config.BASE_DOWNLOAD_DIR, f)), reverse=True)
-                    found_file = os.path.join(config.BASE_DOWNLOAD_DIR, valid_files[0])
-
-                    # Wait till size is stable
-                    if self.is_download_complete(found_file):
-                        time.sleep(1)  # small buffer
-                        break
-    
+            watcher = self.get_download_watcher()
+            log_message(f"Waiting for download in: {watcher.directory}")
+
+            found_file = watcher.wait(config.DOWNLOAD_TIMEOUT)
+
             if not found_file:
                 log_message("Download timeout - file not found")
                 return False
                 
             try:
-                def sanitize_filename(filename):
-                    # Replace any character not in the allowed set with an underscore
-                    # Allowed: alphanumeric, spaces, dots, hyphens, and underscores
-                    return re.sub(r'[\\/*?:"<>|]', "_", filename)
-
                 # Sanitize the rto_name before using it in the filename
-                sanitized_rto_name = sanitize_filename(rto_name)
+                sanitized_rto_name = self.sanitize_filename(rto_name)
                 base_name = f"{sanitized_rto_name}.xlsx"
                 new_filepath = os.path.join(target_dir, base_name)
                 
@@ -537,6 +561,7 @@ class RTOProcessor:
                     log_message("Error: File move operation failed")
                     return False
 
+                self.last_download_path = new_filepath
                 return True
                 
             except Exception as e:
@@ -547,16 +572,6 @@ class RTOProcessor:
             log_message(f"Unexpected error in download wait: {str(e)}")
             return False
         
-    def is_download_complete(file_path, check_interval=2):
-        try:
-            size1 = os.path.getsize(file_path)
-            time.sleep(check_interval)
-            size2 = os.path.getsize(file_path)
-            return size1 == size2
-        except:
-            return False
-
-
     def check_for_503_error(self):
         """
         Detects actual 503 Service Unavailable / Bad Gateway errors based on title or heading tags.
@@ -591,8 +606,24 @@ class RTOProcessor:
             return False
 
 
-    def apply_filters(self):
-        """Apply specific filters"""
+    def get_filter_checkbox_ids(self):
+        return [f"VhCatg:{idx}" for idx in config.VEHICLE_CATEGORIES] + [f"fuel:{idx}" for idx in config.FUEL_TYPES]
+
+    def filters_checked_in_dom(self):
+        """Check every wanted filter checkbox in a single script call"""
+        try:
+            states = js_bridge.checkbox_states(self.browser.driver, self.get_filter_checkbox_ids())
+            return all(states.values())
+        except Exception as e:
+            log_message(f"Could not read filter state from page: {str(e)}")
+            return False
+
+    @profiler.step()
+    def apply_filters(self, force=False):
+        """
+        Apply specific filters. The left panel is only re-applied when the
+        wanted filters differ from the last applied ones or the page lost them.
+        """
         try:
             log_message("Applying left panel filters")
             
@@ -600,26 +631,28 @@ class RTOProcessor:
             refresh_button = self.wait_and_find_element(By.ID, config.RIGHT_REFRESH_BUTTON_LABEL, 20, "right refresh button")
             if refresh_button:
                 self.smart_click(refresh_button, "right refresh button")
-                random_delay(4, 5)
+                self.pacer.settle("right refresh")
+
+            wanted_filters = (tuple(config.VEHICLE_CATEGORIES), tuple(config.FUEL_TYPES))
+            if not force and self.applied_filters == wanted_filters and self.filters_checked_in_dom():
+                log_message("Filters unchanged, skipping left panel")
+                return True
 
             # Open LEFT PANEL options
             self.open_left_panel()
-
-            random_delay(0.5, 1)
             
             # Select TWO WHEELER categories
             self.select_left_panel_option()
 
-            random_delay(0.5, 1)
-
             # Click LEFT REFRESH
             self.click_left_refresh()
 
-            random_delay(3.5, 4)
+            self.pacer.settle("left refresh")
 
             # Close LEFT PANEL if opened
             self.close_left_panel_if_opened()
-            
+
+            self.applied_filters = wanted_filters
             return True
         except Exception as e:
             log_message(f"Error applying filters: {str(e)}")
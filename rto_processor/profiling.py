@@ -0,0 +1,188 @@
+import contextlib
+import datetime
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from configs import config
+from rto_processor.utils import log_context, current_log_context, log_message
+
+
+# Durations are counted in log-spaced buckets, each HISTOGRAM_GROWTH wider than
+# the previous one starting at HISTOGRAM_FLOOR seconds, so percentiles are
+# accurate to about 9% however many spans a run records
+HISTOGRAM_FLOOR = 0.001
+HISTOGRAM_GROWTH = 2 ** (1 / 8)
+
+
+def bucket_of(duration):
+    if duration <= HISTOGRAM_FLOOR:
+        return 0
+    return math.ceil(math.log(duration / HISTOGRAM_FLOOR, HISTOGRAM_GROWTH))
+
+
+def bucket_upper(bucket):
+    return HISTOGRAM_FLOOR * HISTOGRAM_GROWTH ** bucket
+
+
+class SpanStats:
+    """count / total / max and a sparse {bucket: count} histogram of span durations"""
+
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = {}
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        bucket = bucket_of(duration)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+
+    def percentile(self, fraction):
+        """Upper edge of the bucket holding the fraction-th span, capped at the real max"""
+        rank = min(self.count - 1, int(fraction * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                return min(bucket_upper(bucket), self.max)
+        return self.max
+
+
+def summarize(stats):
+    """count / total / p50 / p95 / max in milliseconds"""
+    return {
+        "count": stats.count,
+        "total_ms": round(stats.total * 1000, 1),
+        "p50_ms": round(stats.percentile(0.5) * 1000, 1),
+        "p95_ms": round(stats.percentile(0.95) * 1000, 1),
+        "max_ms": round(stats.max * 1000, 1),
+    }
+
+
+class Profiler:
+    """
+    Collects timing spans for the run.
+
+    kind "step" is a processor step (setup_axis, apply_filters, ...),
+    "webdriver" a single WebDriver command, "wait" time spent waiting for
+    the page to become ready and "sleep" deliberate delays (random_delay,
+    politeness, 503 back-off). Spans are not kept: each one is folded into
+    the SpanStats histogram of its (kind, name, state, worker), so memory
+    stays bounded however long the run is and the report can still give
+    p50/p95 per state and per worker.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.aggregates = {}
+        self.started_at = time.time()
+
+    def record(self, name, duration, kind="step", labels=None):
+        labels = labels if labels is not None else current_log_context()
+        key = (kind, name, labels.get("state"), labels.get("worker"))
+        with self.lock:
+            stats = self.aggregates.get(key)
+            if stats is None:
+                stats = self.aggregates[key] = SpanStats()
+            stats.add(duration)
+
+    @contextlib.contextmanager
+    def span(self, name, kind="step"):
+        labels = current_log_context()
+        start = time.perf_counter()
+        try:
+            with log_context(step=name):
+                yield
+        finally:
+            self.record(name, time.perf_counter() - start, kind, labels)
+
+    def step(self, name=None):
+        """Decorator recording a span around every call of a method"""
+        def decorator(func):
+            step_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(step_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def instrument_driver(self, driver):
+        """Time every WebDriver command; WebElement calls go through driver.execute too"""
+        execute = driver.execute
+
+        def timed_execute(driver_command, params=None):
+            start = time.perf_counter()
+            try:
+                return execute(driver_command, params)
+            finally:
+                self.record(driver_command, time.perf_counter() - start, "webdriver")
+
+        driver.execute = timed_execute
+        return driver
+
+    def report(self):
+        by_kind = defaultdict(lambda: defaultdict(SpanStats))
+        by_state = defaultdict(lambda: defaultdict(SpanStats))
+        by_worker = defaultdict(lambda: defaultdict(SpanStats))
+        with self.lock:
+            for (kind, name, state, worker), stats in self.aggregates.items():
+                by_kind[kind][name].merge(stats)
+                if kind == "step":
+                    by_state[state or "-"][name].merge(stats)
+                    by_worker[str(worker) if worker is not None else "main"][name].merge(stats)
+
+        def table(groups):
+            return {name: summarize(stats) for name, stats in sorted(groups.items())}
+
+        return {
+            "started_at": datetime.datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "wall_time_s": round(time.time() - self.started_at, 1),
+            "totals_s": {
+                kind: round(sum(stats.total for stats in groups.values()), 1)
+                for kind, groups in by_kind.items()
+            },
+            "steps": table(by_kind["step"]),
+            "waits": table(by_kind["wait"]),
+            "sleeps": table(by_kind["sleep"]),
+            "webdriver": table(by_kind["webdriver"]),
+            "per_state": {state: table(groups) for state, groups in sorted(by_state.items())},
+            "per_worker": {worker: table(groups) for worker, groups in sorted(by_worker.items())},
+        }
+
+    def write_report(self, path=None):
+        """Write the JSON report and log the per-step summary"""
+        report = self.report()
+        if path is None:
+            os.makedirs(config.PERF_REPORT_DIR, exist_ok=True)
+            timestamp = datetime.datetime.now().strftime("%Y_%m_%d_%H_%M")
+            path = os.path.join(config.PERF_REPORT_DIR, f"perf_{timestamp}.json")
+        with open(path, "w") as f:
+            json.dump(report, f, indent=4)
+
+        log_message(f"\n=== Performance report ({path}) ===")
+        log_message(f"Wall time {report['wall_time_s']}s, totals by kind: {report['totals_s']}")
+        for name, stats in report["steps"].items():
+            log_message(f"  {name:<32} n={stats['count']:<5} p50={stats['p50_ms']}ms "
+                        f"p95={stats['p95_ms']}ms max={stats['max_ms']}ms")
+        return path
+
+
+profiler = Profiler()
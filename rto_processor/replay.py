@@ -0,0 +1,325 @@
+import base64
+import json
+import os
+import re
+from html.parser import HTMLParser
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urljoin
+from urllib3.util.retry import Retry
+from configs import config
+from rto_processor.utils import log_message
+from rto_processor.profiling import profiler
+
+VIEW_STATE_NAME = "javax.faces.ViewState"
+RTO_COMPONENT = "selectedRto"
+EXPORT_BUTTON = "groupingTable:xls"
+
+UPDATE_RE = re.compile(r'<update id="([^"]+)"><!\[CDATA\[(.*?)\]\]></update>', re.S)
+ERROR_RE = re.compile(r'<error>.*?<error-message><!\[CDATA\[(.*?)\]\]></error-message>', re.S)
+OPTION_RE = re.compile(r'<option\b([^>]*)>(.*?)</option>', re.S)
+VALUE_ATTR_RE = re.compile(r'value="([^"]*)"')
+
+
+class ReplayError(Exception):
+    """Raised when the server rejects a replayed JSF request"""
+
+
+def component_id(label_id):
+    """'selectedYear_label' -> 'selectedYear'"""
+    return label_id[:-len("_label")] if label_id.endswith("_label") else label_id
+
+
+def normalize_label(text):
+    return " ".join(text.split())
+
+
+class JSFFormParser(HTMLParser):
+    """Collects the fields, select options and checkboxes of every form on a JSF page"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms = []
+        self.form = None
+        self.select = None
+        self.option = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "form":
+            self.form = {"id": attrs.get("id"), "action": attrs.get("action", ""),
+                         "fields": [], "selects": {}, "checkboxes": {}}
+            self.forms.append(self.form)
+        elif self.form is None:
+            return
+        elif tag == "input" and attrs.get("name"):
+            input_type = attrs.get("type", "text").lower()
+            if input_type in ("checkbox", "radio"):
+                if attrs.get("id"):
+                    self.form["checkboxes"][attrs["id"]] = {"name": attrs["name"], "value": attrs.get("value", "on")}
+                if "checked" not in attrs:
+                    return
+            elif input_type in ("submit", "button", "image", "file"):
+                return
+            self.form["fields"].append((attrs["name"], attrs.get("value", "")))
+        elif tag == "select" and attrs.get("name"):
+            self.select = {"name": attrs["name"], "id": attrs.get("id"), "options": {}, "selected": None}
+            self.form["selects"][attrs.get("id") or attrs["name"]] = self.select
+        elif tag == "option" and self.select is not None:
+            self.option = {"value": attrs.get("value", ""), "text": "", "selected": "selected" in attrs}
+
+    def handle_data(self, data):
+        if self.option is not None:
+            self.option["text"] += data
+
+    def handle_endtag(self, tag):
+        if tag == "option" and self.option is not None:
+            self.select["options"][normalize_label(self.option["text"])] = self.option["value"]
+            if self.option["selected"] or self.select["selected"] is None:
+                self.select["selected"] = self.option["value"]
+            self.option = None
+        elif tag == "select" and self.select is not None:
+            if self.select["selected"] is not None:
+                self.form["fields"].append((self.select["name"], self.select["selected"]))
+            self.select = None
+        elif tag == "form":
+            self.form = None
+
+
+class JSFReplayEngine:
+    """
+    Alternative to clicking through RTOProcessor for every RTO.
+
+    The live Selenium session is used once to capture cookies and the JSF
+    form (including javax.faces.ViewState); afterwards the PrimeFaces AJAX
+    partial submits for year, RTO and the left panel checkboxes, and
+    the groupingTable:xls export, are posted directly over a pooled
+    requests session. Exposes the same select/filter/download methods as
+    RTOProcessor so main.process_single_rto can use either.
+    """
+
+    def __init__(self, processor, base_url=None):
+        self.processor = processor
+        self.base_url = base_url or config.BASE_URL
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=config.REPLAY_POOL_SIZE,
+            pool_maxsize=config.REPLAY_POOL_SIZE,
+            # Only idempotent methods are retried: a repeated partial submit or
+            # export would run against a view state the server has already moved on
+            max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[502, 503, 504],
+                              allowed_methods=Retry.DEFAULT_ALLOWED_METHODS),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.form = None
+        self.view_state = None
+        self.last_download_path = None
+        self.selected_year = None
+        self.record_counter = 0
+
+    @property
+    def captured(self):
+        return self.form is not None and self.view_state is not None
+
+    def invalidate(self):
+        """Forget the captured view, e.g. after the browser was refreshed"""
+        self.form = None
+        self.view_state = None
+        self.selected_year = None
+
+    def get_output_path(self, state_name, year, rto_name):
+        return self.processor.get_output_path(state_name, year, rto_name)
+
+    @profiler.step("replay.capture_session")
+    def capture_session(self):
+        """Copy cookies, user agent and the JSF form from the live browser"""
+        driver = self.processor.browser.driver
+        self.session.cookies.clear()
+        for cookie in driver.get_cookies():
+            self.session.cookies.set(cookie["name"], cookie["value"],
+                                     domain=cookie.get("domain"), path=cookie.get("path", "/"))
+        self.session.headers["User-Agent"] = driver.execute_script("return navigator.userAgent;")
+        self.session.headers["Referer"] = driver.current_url
+        self._load_form(driver.page_source, driver.current_url)
+        log_message(f"Replay engine captured form {self.form['id']} with {len(self.form['fields'])} fields")
+
+    def bootstrap(self):
+        """Capture the form with a plain GET instead of Selenium (used against the replay stub)"""
+        response = self.session.get(self.base_url, timeout=config.REPLAY_TIMEOUT)
+        response.raise_for_status()
+        self._record("GET", "", response)
+        self._load_form(response.text, response.url)
+
+    def _load_form(self, html, page_url):
+        parser = JSFFormParser()
+        parser.feed(html)
+        forms = [form for form in parser.forms if any(name == VIEW_STATE_NAME for name, _ in form["fields"])]
+        if not forms:
+            raise ReplayError("No JSF form with javax.faces.ViewState found on page")
+        # The report form is the one holding the RTO dropdown
+        form = next((f for f in forms if f"{RTO_COMPONENT}_input" in f["selects"]), forms[0])
+        form["action"] = urljoin(page_url, form["action"] or page_url)
+        self.view_state = dict(form["fields"])[VIEW_STATE_NAME]
+        form["fields"] = [(name, value) for name, value in form["fields"] if name != VIEW_STATE_NAME]
+        self.form = form
+
+    def set_field(self, name, values):
+        """Replace every value submitted under name"""
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        self.form["fields"] = [(n, v) for n, v in self.form["fields"] if n != name]
+        self.form["fields"].extend((name, value) for value in values)
+
+    def _payload(self, extra=()):
+        form_id = self.form["id"]
+        fields = [(name, value) for name, value in self.form["fields"] if name != form_id]
+        return [(form_id, form_id)] + fields + list(extra) + [(VIEW_STATE_NAME, self.view_state)]
+
+    def partial_submit(self, source, event=None, execute=None, render=None):
+        """Send one PrimeFaces AJAX partial submit and absorb the partial response"""
+        params = [
+            ("javax.faces.partial.ajax", "true"),
+            ("javax.faces.source", source),
+            ("javax.faces.partial.execute", execute or source),
+            ("javax.faces.partial.render", render or config.REPLAY_RENDER),
+        ]
+        if event:
+            params += [("javax.faces.behavior.event", event), ("javax.faces.partial.event", event)]
+        else:
+            params.append((source, source))
+
+        response = self.session.post(
+            self.form["action"],
+            data=params + self._payload(),
+            headers={"Faces-Request": "partial/ajax", "X-Requested-With": "XMLHttpRequest"},
+            timeout=config.REPLAY_TIMEOUT,
+        )
+        response.raise_for_status()
+        self._record("POST", source, response)
+        self._absorb_partial_response(response.text)
+        return response
+
+    def _absorb_partial_response(self, text):
+        error = ERROR_RE.search(text)
+        if error:
+            raise ReplayError(error.group(1))
+        for update_id, content in UPDATE_RE.findall(text):
+            if VIEW_STATE_NAME in update_id:
+                self.view_state = content
+            elif update_id.startswith(RTO_COMPONENT):
+                options = {}
+                for attrs, label in OPTION_RE.findall(content):
+                    value = VALUE_ATTR_RE.search(attrs)
+                    options[normalize_label(label)] = value.group(1) if value else label
+                if options:
+                    self.form["selects"].setdefault(f"{RTO_COMPONENT}_input", {})["options"] = options
+
+    def _select_option(self, component, label):
+        select = self.form["selects"].get(f"{component}_input")
+        if not select:
+            raise ReplayError(f"Dropdown {component} not found in captured form")
+        wanted = normalize_label(str(label))
+        value = select["options"].get(wanted)
+        if value is None:
+            # State labels carry the RTO count, e.g. "Goa(13)"
+            base = wanted.split("(")[0].strip()
+            value = next((v for text, v in select["options"].items() if text.split("(")[0].strip() == base), None)
+        if value is None:
+            raise ReplayError(f"Option {label!r} not found in {component}")
+        self.set_field(f"{component}_input", value)
+        self.set_field(f"{component}_focus", "")
+        self.partial_submit(component, event="change")
+
+    @profiler.step("replay.select_year")
+    def select_year(self, year):
+        try:
+            if not self.captured:
+                self.capture_session()
+            self._select_option(component_id(config.YEAR_DROPDOWN_LABEL), year)
+            self.selected_year = str(year)
+            return True
+        except Exception as e:
+            log_message(f"Replay error selecting year {year}: {str(e)}")
+            return False
+
+    def is_rto_selected(self, rto_name):
+        # The RTO stays in the submitted form fields until it is replaced
+        return self.captured
+
+    @profiler.step("replay.select_specific_rto")
+    def select_specific_rto(self, rto_name, state_name, year):
+        try:
+            if not self.captured:
+                self.capture_session()
+            self._select_option(RTO_COMPONENT, rto_name)
+            log_message(f"Replay: selected RTO {rto_name}")
+            return True
+        except Exception as e:
+            log_message(f"Replay error selecting RTO {rto_name}: {str(e)}")
+            return False
+
+    @profiler.step("replay.apply_filters")
+    def apply_filters(self):
+        try:
+            checkboxes = self.form["checkboxes"]
+            for group, indices in (("VhCatg", config.VEHICLE_CATEGORIES), ("fuel", config.FUEL_TYPES)):
+                boxes = [checkboxes[f"{group}:{idx}"] for idx in indices if f"{group}:{idx}" in checkboxes]
+                if not boxes:
+                    continue
+                name = boxes[0]["name"]
+                current = [value for n, value in self.form["fields"] if n == name]
+                self.set_field(name, list(dict.fromkeys(current + [box["value"] for box in boxes])))
+
+            self.partial_submit(config.RIGHT_REFRESH_BUTTON_LABEL, execute="@form")
+            self.partial_submit(config.LEFT_REFRESH_BUTTON_LABEL, execute="@form")
+            log_message("Replay: filters applied")
+            return True
+        except Exception as e:
+            log_message(f"Replay error applying filters: {str(e)}")
+            return False
+
+    @profiler.step("replay.download_excel_rto")
+    def download_excel_rto(self, state_name, year, rto_name):
+        try:
+            output_path = self.get_output_path(state_name, year, rto_name)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+            response = self.session.post(
+                self.form["action"],
+                data=self._payload(extra=[(EXPORT_BUTTON, EXPORT_BUTTON)]),
+                timeout=config.REPLAY_TIMEOUT,
+            )
+            response.raise_for_status()
+            self._record("POST", EXPORT_BUTTON, response)
+            if "html" in response.headers.get("Content-Type", "") or not response.content.startswith(b"PK"):
+                raise ReplayError("Export returned a page instead of an xlsx file")
+
+            temp_path = f"{output_path}.part"
+            with open(temp_path, "wb") as f:
+                f.write(response.content)
+            os.replace(temp_path, output_path)
+
+            self.last_download_path = output_path
+            log_message(f"Replay: saved {output_path} ({len(response.content)} bytes)")
+            return True
+        except Exception as e:
+            log_message(f"Replay error downloading Excel for {rto_name}: {str(e)}")
+            return False
+
+    def _record(self, method, source, response):
+        """Save responses for replay_stub when REPLAY_RECORD_DIR is set"""
+        if not config.REPLAY_RECORD_DIR:
+            return
+        os.makedirs(config.REPLAY_RECORD_DIR, exist_ok=True)
+        self.record_counter += 1
+        safe_source = re.sub(r"[^A-Za-z0-9_]", "_", source) or "page"
+        path = os.path.join(config.REPLAY_RECORD_DIR, f"{self.record_counter:04d}_{method}_{safe_source}.json")
+        with open(path, "w") as f:
+            json.dump({
+                "method": method,
+                "source": source,
+                "status": response.status_code,
+                "content_type": response.headers.get("Content-Type", ""),
+                "body_b64": base64.b64encode(response.content).decode("ascii"),
+            }, f)
@@ -0,0 +1,81 @@
+"""
+Local stand-in for the Vahan dashboard that serves responses recorded by
+JSFReplayEngine (config.REPLAY_RECORD_DIR), so the replay engine can be
+exercised offline:
+
+    python -m rto_processor.replay_stub recordings/ --port 8765
+
+and point the engine at http://127.0.0.1:8765/vahan4dashboard/vahan/view/reportview.xhtml
+"""
+import argparse
+import base64
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from rto_processor.replay import EXPORT_BUTTON
+
+
+def load_recordings(record_dir):
+    """Index recorded responses by (method, source); later recordings win"""
+    recordings = {}
+    for file_name in sorted(os.listdir(record_dir)):
+        if not file_name.endswith(".json"):
+            continue
+        with open(os.path.join(record_dir, file_name)) as f:
+            record = json.load(f)
+        record["body"] = base64.b64decode(record.pop("body_b64"))
+        recordings[(record["method"], record["source"])] = record
+    return recordings
+
+
+class ReplayStubHandler(BaseHTTPRequestHandler):
+    recordings = {}
+
+    def _send(self, record):
+        if record is None:
+            self.send_error(404, "No recording for this request")
+            return
+        self.send_response(record["status"])
+        self.send_header("Content-Type", record["content_type"])
+        self.send_header("Content-Length", str(len(record["body"])))
+        self.send_header("Set-Cookie", "JSESSIONID=replay-stub; Path=/")
+        self.end_headers()
+        self.wfile.write(record["body"])
+
+    def do_GET(self):
+        self._send(self.recordings.get(("GET", "")))
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        params = parse_qs(self.rfile.read(length).decode("utf-8"))
+        if EXPORT_BUTTON in params and "javax.faces.partial.ajax" not in params:
+            source = EXPORT_BUTTON
+        else:
+            source = params.get("javax.faces.source", [""])[0]
+        self._send(self.recordings.get(("POST", source)))
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(record_dir, host="127.0.0.1", port=0):
+    """Start the stub in a background thread and return the server (server.server_port)"""
+    handler = type("BoundReplayStubHandler", (ReplayStubHandler,), {"recordings": load_recordings(record_dir)})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recorded Vahan responses for the replay engine")
+    parser.add_argument("record_dir")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    handler = type("BoundReplayStubHandler", (ReplayStubHandler,), {"recordings": load_recordings(args.record_dir)})
+    print(f"Replay stub serving {args.record_dir} on http://{args.host}:{args.port}")
+    ThreadingHTTPServer((args.host, args.port), handler).serve_forever()
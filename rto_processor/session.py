@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+from configs import config
+from rto_processor.utils import log_message
+
+_driver_path_lock = threading.Lock()
+
+
+def resolve_driver_path(cache_path=None, ttl_hours=None):
+    """
+    chromedriver path from ChromeDriverManager, cached in a small JSON file so
+    a start does not repeat the version check (and possible download) while
+    the cached binary exists and is younger than CHROMEDRIVER_CACHE_TTL_HOURS.
+    """
+    cache_path = cache_path or config.CHROMEDRIVER_CACHE_PATH
+    ttl_hours = config.CHROMEDRIVER_CACHE_TTL_HOURS if ttl_hours is None else ttl_hours
+
+    # Workers starting together resolve the driver once
+    with _driver_path_lock:
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+            if os.path.exists(cached["path"]) and time.time() - cached["resolved_at"] < ttl_hours * 3600:
+                return cached["path"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        from webdriver_manager.chrome import ChromeDriverManager
+        path = ChromeDriverManager().install()
+        try:
+            with open(cache_path, "w") as f:
+                json.dump({"path": path, "resolved_at": time.time()}, f)
+        except OSError as e:
+            log_message(f"Could not cache chromedriver path: {str(e)}")
+        return path
+
+
+class SessionManager:
+    """
+    Keeps Browser sessions warm for the whole process.
+
+    Sessions are keyed by profile name ("main", "worker_0", ...); each uses
+    its own persistent user-data-dir under BROWSER_PROFILE_DIR so static
+    assets stay cached between runs. acquire() hands back the live session
+    for a profile, starting one only when none is alive, and warm_up()
+    launches several in parallel so a worker pool starts in the time of one
+    Chrome launch.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = {}
+
+    def acquire(self, profile="main", download_dir=None):
+        from rto_processor.browser import Browser
+
+        with self.lock:
+            browser = self.sessions.get(profile)
+        if browser is not None and browser.is_alive():
+            if download_dir and download_dir != browser.download_dir:
+                browser.update_download_directory(download_dir)
+            return browser
+        if browser is not None:
+            browser.close()
+
+        browser = Browser(download_dir=download_dir, profile=profile)
+        with self.lock:
+            self.sessions[profile] = browser
+        return browser
+
+    def warm_up(self, profiles, download_dirs=None):
+        """Start sessions for several profiles concurrently"""
+        download_dirs = download_dirs or {}
+        errors = {}
+
+        def start(profile):
+            try:
+                self.acquire(profile, download_dirs.get(profile))
+            except Exception as e:
+                errors[profile] = str(e)
+
+        threads = [threading.Thread(target=start, args=(profile,), daemon=True) for profile in profiles]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for profile, error in errors.items():
+            log_message(f"Failed to warm up browser session {profile}: {error}")
+        return errors
+
+    def discard(self, profile):
+        """Close and forget a session, e.g. after it failed to start properly"""
+        with self.lock:
+            browser = self.sessions.pop(profile, None)
+        if browser is not None:
+            browser.close()
+
+    def close_all(self):
+        with self.lock:
+            browsers, self.sessions = list(self.sessions.values()), {}
+        for browser in browsers:
+            browser.close()
+
+
+sessions = SessionManager()
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import queue
+import random
+import threading
+import time
+from configs import config
+from rto_processor.utils import log_message, log_context
+from rto_processor.profiling import profiler
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def local_etag(path, multipart_threshold, multipart_chunksize):
+    """
+    The ETag S3 reports for an unencrypted object uploaded from `path` with
+    the given transfer settings: the MD5 of the file, or for multipart
+    uploads the MD5 of the concatenated part MD5s followed by "-<parts>".
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if size < multipart_threshold:
+            return hashlib.md5(f.read()).hexdigest()
+        part_digests = []
+        for chunk in iter(lambda: f.read(multipart_chunksize), b""):
+            part_digests.append(hashlib.md5(chunk).digest())
+    return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+
+
+class S3Uploader:
+    """
+    Background upload stage for downloaded workbooks.
+
+    submit() only puts the file on a bounded queue; a pool of threads shares
+    one boto3 client whose connection pool is sized for them and uploads with
+    retries, multipart for large files. Objects whose ETag already matches
+    the local file are skipped. S3_ENDPOINT_URL points the client at a local
+    stand-in such as MinIO or moto_server.
+    """
+
+    def __init__(self, bucket=None, prefix=None, workers=None, queue_size=None, client=None):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+
+        self.bucket = bucket or config.S3_BUCKET_NAME
+        self.prefix = config.S3_PREFIX if prefix is None else prefix
+        self.worker_count = workers or config.S3_UPLOAD_WORKERS
+        self.transfer_config = TransferConfig(
+            multipart_threshold=config.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=config.S3_MULTIPART_CHUNKSIZE,
+            # Files are uploaded concurrently already, keep each transfer single threaded
+            use_threads=False,
+        )
+        self.client = client or boto3.client(
+            "s3",
+            endpoint_url=config.S3_ENDPOINT_URL or None,
+            region_name=config.S3_REGION or None,
+            aws_access_key_id=config.S3_ACCESS_KEY or None,
+            aws_secret_access_key=config.S3_SECRET_KEY or None,
+            config=Config(max_pool_connections=self.worker_count + 2,
+                          retries={"max_attempts": 3, "mode": "standard"}),
+        )
+        self.queue = queue.Queue(maxsize=queue_size or config.S3_UPLOAD_QUEUE_SIZE)
+        self.threads = []
+        self.stats_lock = threading.Lock()
+        self.stats = {"uploaded": 0, "skipped": 0, "failed": 0}
+
+    def start(self):
+        for index in range(self.worker_count):
+            thread = threading.Thread(target=self._run, name=f"uploader-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        log_message(f"S3 uploader started: {self.worker_count} threads, bucket {self.bucket}")
+        return self
+
+    def key_for(self, local_path):
+        """Object key: S3_PREFIX + the path relative to BASE_DOWNLOAD_DIR"""
+        relative_path = os.path.relpath(local_path, config.BASE_DOWNLOAD_DIR)
+        if relative_path.startswith(".."):
+            relative_path = os.path.basename(local_path)
+        return self.prefix + relative_path.replace(os.sep, "/")
+
+    def submit(self, local_path, key=None):
+        """Queue a file for upload; blocks only while the queue is full"""
+        self.queue.put((local_path, key or self.key_for(local_path)))
+
+    def remote_etag(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)["ETag"].strip('"')
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def upload(self, local_path, key):
+        """Upload one file unless S3 already has identical content. Returns 'uploaded' or 'skipped'"""
+        etag = local_etag(local_path, config.S3_MULTIPART_THRESHOLD, config.S3_MULTIPART_CHUNKSIZE)
+        if self.remote_etag(key) == etag:
+            return "skipped"
+        self.client.upload_file(local_path, self.bucket, key, Config=self.transfer_config,
+                                ExtraArgs={"ContentType": XLSX_CONTENT_TYPE})
+        return "uploaded"
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self._upload_with_retry(*item)
+            finally:
+                self.queue.task_done()
+
+    def _upload_with_retry(self, local_path, key):
+        with log_context(upload=key):
+            for attempt in range(1, config.S3_UPLOAD_RETRIES + 1):
+                try:
+                    with profiler.span("s3_upload"):
+                        outcome = self.upload(local_path, key)
+                    self._count(outcome)
+                    log_message(f"S3 {outcome}: s3://{self.bucket}/{key}")
+                    return True
+                except FileNotFoundError:
+                    log_message(f"Local file not found: {local_path}")
+                    break
+                except Exception as e:
+                    log_message(f"Upload attempt {attempt}/{config.S3_UPLOAD_RETRIES} failed for {key}: {str(e)}")
+                    if attempt < config.S3_UPLOAD_RETRIES:
+                        time.sleep(min(30, 2 ** attempt) + random.uniform(0, 1))
+            self._count("failed")
+            return False
+
+    def _count(self, outcome):
+        with self.stats_lock:
+            self.stats[outcome] += 1
+
+    def close(self):
+        """Wait for queued uploads to finish and stop the threads"""
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        log_message(f"S3 uploads finished: {self.stats}")
+        return dict(self.stats)
+
+
+_uploader = None
+_uploader_lock = threading.Lock()
+
+
+def get_uploader():
+    """The shared, started uploader when S3_UPLOAD_ENABLED, otherwise None"""
+    global _uploader
+    if not config.S3_UPLOAD_ENABLED:
+        return None
+    with _uploader_lock:
+        if _uploader is None:
+            _uploader = S3Uploader().start()
+        return _uploader
+
+
+def close_uploader():
+    global _uploader
+    with _uploader_lock:
+        uploader, _uploader = _uploader, None
+    if uploader is not None:
+        uploader.close()
@@ -1,30 +1,108 @@
+import atexit
+import contextlib
 import datetime
+import json
+import logging
+import logging.handlers
+import queue
 import random
+import sys
+import threading
 import time
 import os
 from configs import config
 
 timestamp_str = datetime.datetime.now().strftime("%Y_%m_%d_%H_%M")
-log_file_name = f"log_{timestamp_str}.txt"
+log_file_name = f"log_{timestamp_str}.jsonl"
 
-def log_message(message, log_file=log_file_name):
-    log_dir = os.path.join(os.getcwd(), "logs")
-    os.makedirs(log_dir, exist_ok=True)
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_entry = f"[{timestamp}] {message}\n"
+_log_context = threading.local()
+_loggers = {}
+_loggers_lock = threading.Lock()
 
-    print(log_entry.strip())
 
-    with open(os.path.join(log_dir, log_file), 'a') as f:
-        f.write(log_entry)
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record: timestamp, message, thread and context fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def get_run_logger(log_file=log_file_name):
+    """
+    Logger whose records go through a queue to a background listener thread
+    that owns one open, size-rotated JSON-lines file and the console output.
+    """
+    with _loggers_lock:
+        if log_file in _loggers:
+            return _loggers[log_file]
+
+        log_dir = os.path.join(os.getcwd(), config.LOG_DIR)
+        os.makedirs(log_dir, exist_ok=True)
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_dir, log_file),
+            maxBytes=config.LOG_MAX_BYTES,
+            backupCount=config.LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(JsonLinesFormatter())
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S"))
+
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+        listener.start()
+        atexit.register(listener.stop)
+
+        logger = logging.getLogger(f"rto_processor.run.{log_file}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _loggers[log_file] = logger
+        return logger
+
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """Attach fields such as state, year, rto, step or worker to every log record in this thread"""
+    previous = getattr(_log_context, "fields", {})
+    _log_context.fields = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _log_context.fields = previous
+
+
+def bind_log_context(**fields):
+    """Set fields for the rest of this thread's life, e.g. the worker id"""
+    _log_context.fields = {**getattr(_log_context, "fields", {}), **fields}
+
+
+def current_log_context():
+    return dict(getattr(_log_context, "fields", {}))
+
+
+def log_message(message, log_file=log_file_name, exc_info=False, **fields):
+    """Queue a log record; extra keyword fields (e.g. duration_ms) are added to the JSON line"""
+    record_fields = {**current_log_context(), **fields}
+    get_run_logger(log_file).info(message.strip(), exc_info=exc_info, extra={"fields": record_fields})
 
 def random_delay(min_seconds=0.5, max_seconds=1.0):
     """Add random delay to mimic human behavior"""
     delay = random.uniform(min_seconds, max_seconds)
     time.sleep(delay)
+    # Imported here because profiling itself depends on this module
+    from rto_processor.profiling import profiler
+    profiler.record("random_delay", delay, "sleep")
     return delay
 
 def setup_directories():
     """Create necessary directory structure"""
     os.makedirs(config.BASE_DOWNLOAD_DIR, exist_ok=True)
-
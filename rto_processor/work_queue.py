@@ -0,0 +1,204 @@
+import datetime
+import sqlite3
+import threading
+import time
+from configs import config
+
+# rto value of a task that stands for "list the RTOs of this state and enqueue them"
+ALL_RTOS = "*"
+
+
+class WorkQueue:
+    """
+    Lease-based task queue shared by scraping nodes, keyed by (year, state, RTO).
+
+    The queue is a SQLite file on a volume every node mounts. A node leases a
+    few tasks of one state at a time for QUEUE_LEASE_SECONDS, renews the lease
+    while it works and completes or fails each task. Leases of a node that
+    died simply expire and the tasks are handed out again, so nodes can be
+    added or stopped at any time without partitioning the states by hand.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or config.WORK_QUEUE_PATH
+        self.lock = threading.Lock()
+        # isolation_level=None -> autocommit; leases take an explicit write lock
+        self.conn = sqlite3.connect(self.path, timeout=60, check_same_thread=False, isolation_level=None)
+        # WAL needs shared memory between processes, which network volumes do not provide
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                year TEXT NOT NULL,
+                state TEXT NOT NULL,
+                rto TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (year, state, rto)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires)")
+
+    @staticmethod
+    def _now():
+        return datetime.datetime.now().isoformat(timespec='seconds')
+
+    def _write(self, statements):
+        """Run (sql, params) pairs in one IMMEDIATE transaction; returns the last cursor"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = None
+                for sql, params in statements:
+                    cursor = self.conn.execute(sql, params)
+                self.conn.execute("COMMIT")
+                return cursor
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, tasks):
+        """Add (year, state, rto) tasks; tasks already in the queue keep their status"""
+        now = self._now()
+        with self.lock:
+            before = self.conn.total_changes
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO tasks (year, state, rto, updated_at) VALUES (?, ?, ?, ?)",
+                    [(str(year), state, rto, now) for year, state, rto in tasks]
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+            return self.conn.total_changes - before
+
+    def lease(self, owner, limit=None, lease_seconds=None, prefer=None):
+        """
+        Lease up to `limit` pending tasks of a single (year, state), after
+        reclaiming expired leases. `prefer` is the (year, state) the node is
+        already configured for, taken first when it still has work.
+        Returns a list of (year, state, rto).
+        """
+        limit = limit or config.QUEUE_LEASE_BATCH
+        lease_seconds = lease_seconds or config.QUEUE_LEASE_SECONDS
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Expired leases go back to pending (or to failed) first, so a
+                # task whose node keeps dying is not handed out forever
+                self.conn.execute(*self._reclaim_statement(now, config.QUEUE_MAX_ATTEMPTS))
+                group = None
+                if prefer:
+                    group = self.conn.execute(
+                        "SELECT year, state FROM tasks WHERE year = ? AND state = ? AND status = 'pending' LIMIT 1",
+                        (str(prefer[0]), prefer[1])
+                    ).fetchone()
+                if group is None:
+                    # Whole-state listing tasks first, they create the RTO tasks other nodes need
+                    group = self.conn.execute(
+                        "SELECT year, state FROM tasks WHERE status = 'pending' "
+                        "ORDER BY rto != ?, year, state LIMIT 1",
+                        (ALL_RTOS,)
+                    ).fetchone()
+                if group is None:
+                    self.conn.execute("COMMIT")
+                    return []
+
+                rows = self.conn.execute(
+                    "SELECT rto FROM tasks WHERE year = ? AND state = ? AND status = 'pending' "
+                    "ORDER BY rto != ?, rto LIMIT ?",
+                    (group[0], group[1], ALL_RTOS, limit)
+                ).fetchall()
+                leased = [(group[0], group[1], rto) for (rto,) in rows]
+                self.conn.executemany("""
+                    UPDATE tasks SET status = 'leased', attempts = attempts + 1, lease_owner = ?,
+                        lease_expires = ?, updated_at = ?
+                    WHERE year = ? AND state = ? AND rto = ?
+                """, [(owner, now + lease_seconds, self._now(), *task) for task in leased])
+                self.conn.execute("COMMIT")
+                return leased
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def renew(self, owner, tasks, lease_seconds=None):
+        """Extend the leases `owner` still holds on the given tasks"""
+        if not tasks:
+            return
+        expires = time.time() + (lease_seconds or config.QUEUE_LEASE_SECONDS)
+        self._write([
+            ("UPDATE tasks SET lease_expires = ? WHERE year = ? AND state = ? AND rto = ? "
+             "AND status = 'leased' AND lease_owner = ?", (expires, str(year), state, rto, owner))
+            for year, state, rto in tasks
+        ])
+
+    def complete(self, owner, year, state, rto):
+        """Mark a task done if `owner` still holds its lease"""
+        self._write([(
+            "UPDATE tasks SET status = 'done', lease_expires = NULL, updated_at = ? "
+            "WHERE year = ? AND state = ? AND rto = ? AND status = 'leased' AND lease_owner = ?",
+            (self._now(), str(year), state, rto, owner)
+        )])
+
+    def fail(self, owner, year, state, rto, max_attempts=None):
+        """Give a failed task back to the queue, or mark it failed after max_attempts leases"""
+        max_attempts = max_attempts or config.QUEUE_MAX_ATTEMPTS
+        self._write([(
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_expires = NULL, updated_at = ? "
+            "WHERE year = ? AND state = ? AND rto = ? AND status = 'leased' AND lease_owner = ?",
+            (max_attempts, self._now(), str(year), state, rto, owner)
+        )])
+
+    def release(self, owner, tasks):
+        """Hand leased tasks back untouched; the lease does not count as an attempt"""
+        if not tasks:
+            return
+        now = self._now()
+        self._write([
+            ("UPDATE tasks SET status = 'pending', attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+             "lease_expires = NULL, updated_at = ? "
+             "WHERE year = ? AND state = ? AND rto = ? AND status = 'leased' AND lease_owner = ?",
+             (now, str(year), state, rto, owner))
+            for year, state, rto in tasks
+        ])
+
+    def _reclaim_statement(self, now, max_attempts):
+        # Every lease already counted as an attempt, so a task whose node died
+        # max_attempts times is failed instead of being handed out again
+        return (
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_expires < ?",
+            (max_attempts, self._now(), now)
+        )
+
+    def reclaim_expired(self, max_attempts=None):
+        """Return tasks whose lease ran out to pending, or fail them after max_attempts; returns how many"""
+        cursor = self._write([self._reclaim_statement(time.time(), max_attempts or config.QUEUE_MAX_ATTEMPTS)])
+        return cursor.rowcount
+
+    def counts(self):
+        """{status: number of tasks}"""
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return dict(rows)
+
+    def is_drained(self):
+        counts = self.counts()
+        return not counts.get("pending") and not counts.get("leased")
+
+    def failed_tasks(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT year, state, rto FROM tasks WHERE status = 'failed' ORDER BY year, state, rto"
+            ).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,108 @@
+"""
+Benchmark the streaming Vahan reader against the pandas path used by
+clean_data.clean_dataframe, and check both read the same cells: the same
+makers, the same month columns and the same count in every maker x month
+cell. Exits non-zero when any file differs or only one reader can read it.
+
+    cd scripts && python bench_reader.py --year 2023
+
+Measured on the local rto_wise_data corpus (one core): 2023, 799 files,
+13.8 vs 1.6 ms/file (8.5x), every cell equal; 2024, 253 files, 20.4 vs
+2.9 ms/file (7.0x), every cell equal; 2025, 1591 files, 5.2x, but
+clean_dataframe fails on the 1189 sheets that already have a JUN column,
+which the streaming reader reads.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import numpy as np
+
+from clean_data import clean_dataframe, months_for_year
+from vahan_reader import read_vahan_table
+
+
+def time_reader(name, files, read):
+    start = time.perf_counter()
+    results = {}
+    errors = {}
+    for path in files:
+        try:
+            results[path] = read(path)
+        except Exception as e:
+            errors[path] = str(e)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {len(files)} files in {elapsed:8.2f}s  "
+          f"({elapsed / max(len(files), 1) * 1000:7.2f} ms/file, {len(errors)} failed)")
+    return results, errors, elapsed
+
+
+def pandas_cells(path, months):
+    """(makers, months, int64 counts) as clean_dataframe reads them"""
+    df = clean_dataframe(path, months)
+    present = [month for month in months if month in df.columns]
+    if 'MAKER' not in df.columns:
+        # Sheets without data rows lose their maker and month columns to dropna
+        return [], present, np.zeros((0, len(present)), dtype=np.int64)
+    df = df[df['MAKER'].notna() & (df['MAKER'].astype(str).str.strip() != '')]
+    return (df['MAKER'].astype(str).str.strip().tolist(), present,
+            df[present].to_numpy(dtype=np.int64))
+
+
+def streaming_cells(path, months):
+    table = read_vahan_table(path, months)
+    return table.makers, table.months, table.counts.astype(np.int64)
+
+
+def compare_cells(expected, actual):
+    """None when both readers agree, otherwise a description of the first difference"""
+    makers, months, counts = expected
+    other_makers, other_months, other_counts = actual
+    if not makers and not other_makers:
+        # pandas drops the month columns of sheets without data rows
+        return None
+    if months != other_months:
+        return f"month columns differ: pandas={months} streaming={other_months}"
+    if makers != other_makers:
+        return f"makers differ: pandas has {len(makers)} rows, streaming {len(other_makers)}"
+    diff = np.argwhere(counts != other_counts)
+    if len(diff):
+        row, col = diff[0]
+        return (f"{len(diff)} cells differ, first {makers[row]} {months[col]}: "
+                f"pandas={counts[row, col]} streaming={other_counts[row, col]}")
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark xlsx readers on the rto_wise_data corpus")
+    parser.add_argument("--input", default="../rto_wise_data")
+    parser.add_argument("--year", default="2023")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N files")
+    args = parser.parse_args()
+
+    files = sorted(glob.glob(os.path.join(args.input, args.year, "*", "*.xlsx")))
+    files = [f for f in files if not os.path.basename(f).startswith("~$")][:args.limit]
+    months = months_for_year(args.year)
+
+    pandas_results, pandas_errors, pandas_time = time_reader(
+        "pandas", files, lambda path: pandas_cells(path, months))
+    stream_results, stream_errors, stream_time = time_reader(
+        "streaming", files, lambda path: streaming_cells(path, months))
+
+    differences = {}
+    for path in files:
+        if path in pandas_errors or path in stream_errors:
+            if (path in pandas_errors) != (path in stream_errors):
+                differences[path] = (f"only one reader failed: pandas={pandas_errors.get(path)} "
+                                     f"streaming={stream_errors.get(path)}")
+            continue
+        difference = compare_cells(pandas_results[path], stream_results[path])
+        if difference:
+            differences[path] = difference
+
+    print(f"Speed-up: {pandas_time / max(stream_time, 1e-9):.1f}x, "
+          f"{len(differences)} files where the readers disagree")
+    for path, difference in list(differences.items())[:10]:
+        print(f"  {path}: {difference}")
+    sys.exit(1 if differences else 0)
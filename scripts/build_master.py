@@ -0,0 +1,191 @@
+"""
+Build the consolidated master dataset (MAKER, YEAR, STATE, RTO, months,
+TOTAL) straight from the raw downloads in one pass:
+
+    cd scripts && python build_master.py --years 2022 2023 2024 2025 --output master.parquet
+
+Workbooks are read in batches with vahan_reader, the totals of a whole
+batch are checked together by normalize.normalize_batch, the columns are
+appended to growing column chunks, and the table is concatenated and
+written once at the end - no intermediate _cleaned.xlsx files and no
+repeated pd.concat copies. Rows whose exported TOTAL disagrees with the
+month sum are flagged in TOTAL_MISMATCH and reported per year; when more
+than --max-mismatch-rate of a year's rows disagree the build fails with a
+non-zero exit and no output is written.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from clean_data import month_cols_full, months_for_year, state_label
+from normalize import normalize_batch, split_rows
+from vahan_reader import read_vahan_values
+
+
+def collect_sources(base_folder_path, years):
+    """(path, year, state, rto) for every RTO workbook of the given years"""
+    sources = []
+    for year in years:
+        year_path = os.path.join(base_folder_path, str(year))
+        if not os.path.isdir(year_path):
+            continue
+        for state_folder in sorted(os.listdir(year_path)):
+            state_path = os.path.join(year_path, state_folder)
+            if not os.path.isdir(state_path):
+                continue
+            for rto_file in sorted(os.listdir(state_path)):
+                if rto_file.endswith('.xlsx') and not rto_file.startswith('~$'):
+                    sources.append((os.path.join(state_path, rto_file), str(year),
+                                    state_label(state_folder), os.path.splitext(rto_file)[0]))
+    return sources
+
+
+def full_year_values(values, months):
+    """Place a sheet's month columns (and TOTAL) into the JAN..DEC + TOTAL layout; missing months stay 0"""
+    full = np.zeros((len(values), len(month_cols_full) + 1), dtype=np.int64)
+    for i, month in enumerate(months):
+        full[:, month_cols_full.index(month)] = values[:, i]
+    full[:, -1] = values[:, -1]
+    return full
+
+
+def read_batch(batch):
+    """
+    Read a batch of workbooks and check the totals of all of them in one
+    normalize_batch call. Returns (makers, counts, vahan_totals) per source,
+    or the error message for sources that could not be read.
+    """
+    results, blocks = [], []
+    for path, year, _, _ in batch:
+        try:
+            makers, months, values = read_vahan_values(path, months_for_year(year))
+        except Exception as e:
+            results.append(str(e))
+            continue
+        results.append(makers)
+        blocks.append(full_year_values(values, months))
+
+    parsed = normalize_batch(blocks, len(month_cols_full))
+    sizes = [len(block) for block in blocks]
+    counts = iter(split_rows(parsed.counts, sizes))
+    vahan_totals = iter(split_rows(parsed.vahan_totals, sizes))
+    return [result if isinstance(result, str) else (result, next(counts), next(vahan_totals))
+            for result in results]
+
+
+class MasterTableBuilder:
+    """Appends per-RTO column chunks and materialises the table once"""
+
+    def __init__(self):
+        self.makers = []
+        self.count_chunks = []
+        self.vahan_total_chunks = []
+        # (year, state, rto, row count) - expanded with np.repeat at the end
+        self.keys = []
+
+    def append(self, year, state, rto, makers, counts, vahan_totals):
+        if not makers:
+            return
+        self.makers.extend(makers)
+        self.count_chunks.append(counts)
+        self.vahan_total_chunks.append(vahan_totals)
+        self.keys.append((year, state, rto, len(makers)))
+
+    def to_frame(self):
+        counts = (np.concatenate(self.count_chunks) if self.count_chunks
+                  else np.zeros((0, len(month_cols_full)), dtype=np.int32))
+        sizes = [n for _, _, _, n in self.keys]
+
+        def repeated(position):
+            return pd.Categorical(np.repeat([key[position] for key in self.keys], sizes))
+
+        frame = pd.DataFrame({
+            'MAKER': pd.Categorical(self.makers),
+            'YEAR': repeated(0),
+            'STATE': repeated(1),
+            'RTO': repeated(2),
+        })
+        for i, month in enumerate(month_cols_full):
+            frame[month] = counts[:, i]
+        # One reduction over the whole corpus; rows where Vahan's exported
+        # TOTAL disagrees with the month sum are flagged, not corrected
+        frame['TOTAL'] = counts.sum(axis=1, dtype=np.int64)
+        frame['VAHAN_TOTAL'] = (np.concatenate(self.vahan_total_chunks) if self.vahan_total_chunks
+                                else np.zeros(0, dtype=np.int64))
+        frame['TOTAL_MISMATCH'] = frame['TOTAL'].to_numpy() != frame['VAHAN_TOTAL'].to_numpy()
+        return frame
+
+
+def build_master(base_folder_path, years, workers=None, batch_size=64):
+    sources = collect_sources(base_folder_path, years)
+    workers = workers or os.cpu_count() or 1
+    print(f"Reading {len(sources)} workbooks for {', '.join(map(str, years))} with {workers} workers")
+
+    batches = [sources[i:i + batch_size] for i in range(0, len(sources), batch_size)]
+    builder = MasterTableBuilder()
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch, results in zip(batches, executor.map(read_batch, batches)):
+            for source, result in zip(batch, results):
+                if isinstance(result, str):
+                    failed.append((source[0], result))
+                    continue
+                _, year, state, rto = source
+                builder.append(year, state, rto, *result)
+
+    for path, error in failed:
+        print(f"❌ Failed {path}: {error}")
+    return builder.to_frame()
+
+
+def mismatch_report(frame):
+    """{year: (rows, rows where Vahan's TOTAL differs from the month sum)}"""
+    grouped = frame.groupby('YEAR', observed=True)['TOTAL_MISMATCH'].agg(['size', 'sum'])
+    return {str(year): (int(row['size']), int(row['sum'])) for year, row in grouped.iterrows()}
+
+
+def check_mismatches(frame, max_rate):
+    """Print the per-year mismatch counts; False when any year is above max_rate"""
+    ok = True
+    for year, (rows, mismatches) in sorted(mismatch_report(frame).items()):
+        rate = mismatches / rows if rows else 0.0
+        if rate > max_rate:
+            ok = False
+            print(f"❌ {year}: {mismatches} of {rows} rows ({rate:.2%}) where Vahan's TOTAL differs "
+                  f"from the month sum, above {max_rate:.2%}")
+        elif mismatches:
+            print(f"⚠️ {year}: {mismatches} of {rows} rows ({rate:.2%}) flagged in TOTAL_MISMATCH")
+    return ok
+
+
+def write_master(frame, output_path):
+    if output_path.endswith('.parquet'):
+        frame.to_parquet(output_path, index=False)
+    elif output_path.endswith('.csv'):
+        frame.to_csv(output_path, index=False)
+    else:
+        frame.to_excel(output_path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the master RTO dataset from raw Vahan downloads")
+    parser.add_argument("--input", default="../rto_wise_data")
+    parser.add_argument("--years", nargs="+", default=["2023"])
+    parser.add_argument("--output", default="./reports/master.parquet", help=".parquet, .csv or .xlsx")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=64, help="Workbooks parsed together per task")
+    parser.add_argument("--max-mismatch-rate", type=float, default=0.01,
+                        help="Fail when a larger share of a year's rows has a TOTAL mismatch")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    master = build_master(args.input, args.years, args.workers, args.batch_size)
+    if not check_mismatches(master, args.max_mismatch_rate):
+        sys.exit(1)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    write_master(master, args.output)
+    print(f"✅ Wrote {len(master)} rows to {args.output} in {time.perf_counter() - start:.1f}s")
@@ -1,4 +1,9 @@
+import argparse
+import datetime
+import hashlib
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 
 # Months available in order
@@ -7,80 +12,245 @@ month_cols_full = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN',
 
 start_row = 4  # row 5 in Excel is index 4
 
-def clean_excel_file(input_path, output_path, available_months):
-    try:
-        # Read from 5th row onward (zero-indexed row 4)
-        df = pd.read_excel(input_path, header=None, skiprows=start_row)
-        
-        # Drop columns that are all NaN but **do not drop all rows**
-        df.dropna(axis=1, how='all', inplace=True)
+def months_for_year(year):
+    return month_cols_full[:5] if str(year) == '2025' else month_cols_full
 
-        # Assign headers (truncate if fewer columns)
-        headers = ['S NO', 'MAKER'] + available_months + ['TOTAL']
-        df.columns = headers[:len(df.columns)]
+def state_label(state_folder):
+    """'Tamil Nadu(148)' / 'Andhra_Pradesh' -> 'Tamil Nadu' / 'Andhra Pradesh'"""
+    return state_folder.split('(')[0].replace('_', ' ').strip()
 
-        # Convert month data to numeric where possible
-        for col in available_months:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '').str.strip(), errors='coerce').fillna(0)
+def parquet_frame(df, rto_name):
+    """
+    Typed frame for the Parquet dataset: dictionary-encoded RTO and MAKER,
+    int32 months and TOTAL. Every partition carries all twelve months (0
+    where the year has no data yet) so the dataset keeps a single schema.
+    YEAR and STATE come from the partition folders.
+    """
+    out = pd.DataFrame({
+        'RTO': pd.Categorical([rto_name] * len(df)),
+        'MAKER': (df['MAKER'].astype(str).astype('category') if 'MAKER' in df.columns
+                  else pd.Categorical([None] * len(df))),
+    })
+    for col in month_cols_full + ['TOTAL']:
+        if col in df.columns:
+            out[col] = df[col].fillna(0).astype('int32').values
+        else:
+            out[col] = pd.Series(0, index=out.index, dtype='int32')
+    return out
 
-        # Serial Number (if no rows, this will be empty series)
-        df['S NO'] = range(1, len(df) + 1)
+def clean_dataframe(input_path, available_months):
+    """Load one Vahan export with pandas and normalise its month and TOTAL columns"""
+    # Read from 5th row onward (zero-indexed row 4)
+    df = pd.read_excel(input_path, header=None, skiprows=start_row)
 
-        # Recalculate total column if months exist
-        if len(df) > 0:
-            df['TOTAL'] = df[available_months].sum(axis=1).astype(int)
-        else:
-            # Create TOTAL column with no rows (just header)
-            df['TOTAL'] = pd.Series(dtype=int)
+    # Drop columns that are all NaN but **do not drop all rows**
+    df.dropna(axis=1, how='all', inplace=True)
+
+    # Assign headers (truncate if fewer columns)
+    headers = ['S NO', 'MAKER'] + available_months + ['TOTAL']
+    df.columns = headers[:len(df.columns)]
+
+    # Convert month data to numeric where possible
+    for col in available_months:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col].astype(str).str.replace(',', '').str.strip(), errors='coerce').fillna(0)
+
+    # Serial Number (if no rows, this will be empty series)
+    df['S NO'] = range(1, len(df) + 1)
+
+    # Recalculate total column if months exist
+    if len(df) > 0:
+        df['TOTAL'] = df[available_months].sum(axis=1).astype(int)
+    else:
+        # Create TOTAL column with no rows (just header)
+        df['TOTAL'] = pd.Series(dtype=int)
+    return df
+
+def clean_excel_file(input_path, output_path, available_months, output_format="xlsx", rto_name=None):
+    """Clean one Vahan export; returns a manifest entry instead of printing"""
+    result = {"source": input_path, "output": output_path, "status": "ok", "rows": 0, "error": None}
+    try:
+        df = clean_dataframe(input_path, available_months)
 
         # Ensure output folder exists
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
         # Save dataframe even if empty (just headers)
-        df.to_excel(output_path, index=False)
-        print(f"✅ Saved: {output_path}")
+        if output_format == "parquet":
+            rto_name = rto_name or os.path.splitext(os.path.basename(input_path))[0]
+            parquet_frame(df, rto_name).to_parquet(output_path, index=False)
+        else:
+            df.to_excel(output_path, index=False)
+        result["rows"] = len(df)
 
     except Exception as e:
-        print(f"❌ Failed {input_path}: {e}")
+        result["status"] = "failed"
+        result["error"] = str(e)
+    return result
 
-if __name__ == "__main__":
-    # Base paths
-    base_folder_path = "../rto_wise_data"
-    output_base_path = "./cleaned_rto_wise_data"
-    os.makedirs(output_base_path, exist_ok=True)
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_fingerprint(path, with_hash=True):
+    stat = os.stat(path)
+    fingerprint = {"source_size": stat.st_size, "source_mtime": stat.st_mtime}
+    if with_hash:
+        fingerprint["source_sha256"] = file_sha256(path)
+    return fingerprint
+
+def clean_job(job):
+    input_path = job[0]
+    fingerprint = source_fingerprint(input_path)
+    result = clean_excel_file(*job)
+    result.update(fingerprint)
+    result["cleaned_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+    return result
+
+def load_manifest(manifest_path):
+    """Previous manifest entries keyed by output path"""
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return {entry["output"]: entry for entry in json.load(f).get("files", [])}
+
+def unchanged_entry(job, previous):
+    """
+    Return the previous manifest entry if the source is unchanged since it was
+    cleaned: same size and mtime, or same content hash when only mtime moved.
+    """
+    input_path, output_path = job[0], job[1]
+    entry = previous.get(output_path)
+    if not entry or entry.get("status") != "ok" or entry.get("source") != input_path:
+        return None
+    if not os.path.exists(output_path) or "source_sha256" not in entry:
+        return None
+
+    fingerprint = source_fingerprint(input_path, with_hash=False)
+    if fingerprint["source_size"] != entry["source_size"]:
+        return None
+    if fingerprint["source_mtime"] != entry["source_mtime"]:
+        if file_sha256(input_path) != entry["source_sha256"]:
+            return None
+        entry = {**entry, "source_mtime": fingerprint["source_mtime"]}
+    return entry
+
+def carried_over_entries(previous, current_outputs):
+    """
+    Entries of the previous manifest outside this run (other years or
+    formats) whose source file still exists, so cleaning one year neither
+    forgets the rest nor keeps files that were deleted since.
+    """
+    return [entry for output, entry in previous.items()
+            if output not in current_outputs and os.path.exists(entry.get("source", ""))]
+
+def cleaned_output_path(output_base_path, year, state_folder, rto_name, output_format="xlsx"):
+    if output_format == "parquet":
+        return os.path.join(output_base_path, "parquet", f"YEAR={year}",
+                            f"STATE={state_label(state_folder)}", f"{rto_name}.parquet")
+    return os.path.join(output_base_path, str(year), state_folder, f"{rto_name}_cleaned.xlsx")
 
-    for year in ["2023"]:
+def collect_jobs(base_folder_path, output_base_path, years, output_format="xlsx"):
+    """
+    (input, output, months, format, rto) for every RTO workbook of the given
+    years. Parquet outputs form a dataset partitioned as YEAR=<year>/STATE=<state>.
+    Paths are absolute so the manifest matches whatever directory a run starts in.
+    """
+    base_folder_path = os.path.abspath(base_folder_path)
+    output_base_path = os.path.abspath(output_base_path)
+    jobs = []
+    for year in years:
         year_path = os.path.join(base_folder_path, str(year))
         if not os.path.isdir(year_path):
             continue
-            
-        print(f"\nProcessing year: {year}")
-        
-        available_months = month_cols_full[:5] if year == '2025' else month_cols_full
-
-        # DEBUG: Print all folders in the year directory
-        print(f"Files found in year {year}: {os.listdir(year_path)}")
 
-        # Process each state
-        for state_folder in os.listdir(year_path):
+        available_months = months_for_year(year)
+        for state_folder in sorted(os.listdir(year_path)):
             state_path = os.path.join(year_path, state_folder)
             if not os.path.isdir(state_path):
                 continue
-                
-            print(f"Processing state: {state_folder}")
-            
-            # Process each RTO file
-            for rto_file in os.listdir(state_path):
+
+            for rto_file in sorted(os.listdir(state_path)):
                 if not rto_file.endswith('.xlsx') or rto_file.startswith('~$'):
                     continue
-                    
-                # Setup input and output paths
                 input_file = os.path.join(state_path, rto_file)
-                output_file = os.path.join(output_base_path, year, state_folder, f"{os.path.splitext(rto_file)[0]}_cleaned.xlsx")
-                
-                # Clean the file
-                clean_excel_file(input_file, output_file, available_months)
+                rto_name = os.path.splitext(rto_file)[0]
+                output_file = cleaned_output_path(output_base_path, year, state_folder, rto_name, output_format)
+                jobs.append((input_file, output_file, available_months, output_format, rto_name))
+    return jobs
+
+def write_manifest(results, manifest_path, skipped=0):
+    manifest = {
+        "generated_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "succeeded": sum(1 for r in results if r["status"] == "ok"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "skipped_unchanged": skipped,
+        "files": results,
+    }
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+def load_parquet_dataset(output_base_path="./cleaned_rto_wise_data"):
+    """All cleaned Parquet files as one DataFrame with YEAR and STATE columns"""
+    return pd.read_parquet(os.path.join(output_base_path, "parquet"))
+
+def clean_corpus(base_folder_path, output_base_path, years, workers=None, manifest_path=None, force=False,
+                 output_format="xlsx"):
+    """
+    Clean the RTO workbooks of the given years on a process pool. Files whose
+    source is unchanged since the manifest was written are skipped unless force;
+    force re-cleans them but still keeps the manifest entries of other years.
+    """
+    os.makedirs(output_base_path, exist_ok=True)
+    manifest_path = manifest_path or os.path.join(output_base_path, "manifest.json")
+    workers = workers or os.cpu_count() or 1
+
+    previous = load_manifest(manifest_path)
+    all_jobs = collect_jobs(base_folder_path, output_base_path, years, output_format)
+    jobs, unchanged = [], []
+    for job in all_jobs:
+        entry = None if force else unchanged_entry(job, previous)
+        if entry:
+            unchanged.append(entry)
+        else:
+            jobs.append(job)
+    print(f"Cleaning {len(jobs)} new or changed files ({len(unchanged)} unchanged) "
+          f"for {', '.join(map(str, years))} with {workers} workers")
+
+    if workers == 1 or len(jobs) <= 1:
+        results = [clean_job(job) for job in jobs]
+    else:
+        # Chunks keep the per-task IPC overhead small next to the Excel I/O
+        chunksize = max(1, len(jobs) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(clean_job, jobs, chunksize=chunksize))
+
+    other_years = carried_over_entries(previous, {job[1] for job in all_jobs})
+    manifest = write_manifest(unchanged + results + other_years, manifest_path, skipped=len(unchanged))
+    print(f"✅ {manifest['succeeded']} ok, ❌ {manifest['failed']} failed, "
+          f"{len(unchanged)} unchanged - manifest: {manifest_path}")
+    for result in results:
+        if result["status"] == "failed":
+            print(f"❌ Failed {result['source']}: {result['error']}")
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean downloaded Vahan RTO workbooks")
+    parser.add_argument("--input", default="../rto_wise_data", help="Base folder of the raw downloads")
+    parser.add_argument("--output", default="./cleaned_rto_wise_data", help="Folder for the cleaned files")
+    parser.add_argument("--years", nargs="+", default=["2023"])
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--manifest", default=None, help="Manifest path (default: <output>/manifest.json)")
+    parser.add_argument("--force", action="store_true", help="Re-clean files even if their source is unchanged")
+    parser.add_argument("--format", choices=["xlsx", "parquet"], default="xlsx",
+                        help="parquet writes one dataset partitioned by YEAR/STATE under <output>/parquet")
+    args = parser.parse_args()
+
+    clean_corpus(args.input, args.output, args.years, args.workers, args.manifest, args.force, args.format)
 
 
     # base_folder_path = "VahanData/[EV]BrandWiseRTOWiseMonthWise2024"
@@ -0,0 +1,34 @@
+"""
+Corpus-wide normalisation of Vahan counts.
+
+The readers deliver one int64 (rows, months + 1) block per file with
+Vahan's TOTAL in the last column. Instead of checking one file at a time,
+the blocks of many files are stacked into one 2-D array, the totals are
+recomputed with a single reduction and compared against Vahan's own TOTAL.
+"""
+from collections import namedtuple
+import numpy as np
+
+NormalizedBatch = namedtuple("NormalizedBatch", ["counts", "totals", "vahan_totals", "mismatch"])
+
+
+def normalize_batch(value_blocks, month_count=None):
+    """
+    Stack the value blocks of many files (all with the same columns, TOTAL
+    last) and return int32 month counts, recomputed totals, the exported
+    totals and a mask of rows where the two disagree, in block order.
+    """
+    if not value_blocks:
+        width = month_count or 0
+        empty = np.zeros(0, dtype=np.int64)
+        return NormalizedBatch(np.zeros((0, width), dtype=np.int32), empty, empty, empty.astype(bool))
+    values = np.concatenate(value_blocks)
+    counts = values[:, :-1]
+    totals = counts.sum(axis=1)
+    vahan_totals = values[:, -1]
+    return NormalizedBatch(counts.astype(np.int32), totals, vahan_totals, totals != vahan_totals)
+
+
+def split_rows(array, block_sizes):
+    """Split a stacked batch result back into per-file pieces"""
+    return np.split(array, np.cumsum(block_sizes)[:-1])
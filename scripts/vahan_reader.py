@@ -0,0 +1,184 @@
+"""
+Streaming reader for Vahan "Maker Month Wise" exports.
+
+Every export has the same layout: title and header rows, the month names
+in row 4 and data from row 5 (start_row = 4) as S NO, MAKER, one column per
+month and TOTAL, all stored as shared strings such as "1,234". Instead of
+loading the workbook through pandas/openpyxl, the sheet XML is parsed in one
+iterparse pass and the counts go straight into a preallocated int array.
+"""
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+import numpy as np
+
+NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+month_cols_full = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN',
+                   'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+
+start_row = 4  # row 5 in Excel is index 4
+header_row = 3  # month names are in row 4
+
+CELL_REF_RE = re.compile(r"([A-Z]+)(\d+)")
+DIMENSION_RE = re.compile(rb'<dimension ref="[A-Z]+\d+:[A-Z]+(\d+)"')
+
+# makers: list of names; months: month names of the sheet; counts: int32 (rows, months);
+# vahan_totals: TOTAL as exported
+VahanTable = namedtuple("VahanTable", ["makers", "months", "counts", "vahan_totals"])
+
+
+def column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def to_int(text):
+    """'1,234' -> 1234; blanks and non-numbers -> 0 like pd.to_numeric(errors='coerce').fillna(0)"""
+    if not text:
+        return 0
+    try:
+        return int(text.replace(",", "").strip())
+    except ValueError:
+        try:
+            return int(float(text.replace(",", "").strip()))
+        except ValueError:
+            return 0
+
+
+def header_text(text):
+    """'\xa0\xa0TOTAL\xa0\xa0' -> 'TOTAL'; export headers are padded with non-breaking spaces"""
+    return text.replace("\xa0", " ").strip().upper()
+
+
+def read_shared_strings(zf):
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    strings = []
+    for _, elem in ET.iterparse(zf.open("xl/sharedStrings.xml"), events=("end",)):
+        if elem.tag == f"{NS}si":
+            strings.append("".join(t.text or "" for t in elem.iter(f"{NS}t")))
+            elem.clear()
+    return strings
+
+
+def first_sheet_path(zf):
+    """Resolve the first worksheet through workbook.xml and its relationships"""
+    try:
+        workbook = ET.fromstring(zf.read("xl/workbook.xml"))
+        rel_id = workbook.find(f"{NS}sheets/{NS}sheet").get(f"{REL_NS}id")
+        rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        for rel in rels.iter(f"{PKG_REL_NS}Relationship"):
+            if rel.get("Id") == rel_id:
+                target = rel.get("Target").lstrip("/")
+                return target if target.startswith("xl/") else f"xl/{target}"
+    except (KeyError, AttributeError, ET.ParseError):
+        pass
+    return "xl/worksheets/sheet1.xml"
+
+
+def iter_rows(zf, sheet_path, shared_strings):
+    """Yield (row_index, {column_index: text}) for every row of the sheet"""
+    for _, elem in ET.iterparse(zf.open(sheet_path), events=("end",)):
+        if elem.tag != f"{NS}row":
+            continue
+        cells = {}
+        for cell in elem.iter(f"{NS}c"):
+            match = CELL_REF_RE.match(cell.get("r", ""))
+            if not match:
+                continue
+            cell_type = cell.get("t")
+            if cell_type == "inlineStr":
+                value = "".join(t.text or "" for t in cell.iter(f"{NS}t"))
+            else:
+                v = cell.find(f"{NS}v")
+                value = v.text if v is not None else None
+                if value is not None and cell_type == "s":
+                    value = shared_strings[int(value)]
+            if value is not None:
+                cells[column_index(match.group(1))] = value
+        yield int(elem.get("r")) - 1, cells
+        elem.clear()
+
+
+def sheet_row_count(zf, sheet_path):
+    """Row count from the <dimension> element, used to size the arrays"""
+    with zf.open(sheet_path) as f:
+        match = DIMENSION_RE.search(f.read(2048))
+    return int(match.group(1)) if match else 0
+
+
+def resolve_layout(month_columns, total_column, available_months):
+    """
+    (months, value columns) for a sheet: the months found in the header row
+    followed by the TOTAL column. Sheets without month headers fall back to
+    the fixed S NO, MAKER, months..., TOTAL layout of available_months.
+    """
+    if not month_columns:
+        columns = list(range(2, 2 + len(available_months)))
+        total = total_column if total_column is not None else 2 + len(available_months)
+        return list(available_months), columns + [total]
+    if total_column is None:
+        total_column = max(col for col, _ in month_columns) + 1
+    return [month for _, month in month_columns], [col for col, _ in month_columns] + [total_column]
+
+
+def read_vahan_values(path, available_months=month_cols_full):
+    """
+    Read one export as (makers, months, values). values is an int64
+    (rows, months + 1) array, preallocated from the sheet dimension and
+    filled while the rows stream; its last column is Vahan's TOTAL.
+
+    months are all month names of the header row in sheet order, so a 2025
+    export that already has JUN keeps it even when available_months stops
+    at MAY; available_months only matters for sheets without a header. TOTAL
+    is the column headed TOTAL (padded with non-breaking spaces in the
+    export). Rows without a maker name are skipped.
+    """
+    with zipfile.ZipFile(path) as zf:
+        shared_strings = read_shared_strings(zf)
+        sheet_path = first_sheet_path(zf)
+        capacity = max(sheet_row_count(zf, sheet_path) - start_row, 0)
+
+        makers = []
+        month_columns = []
+        total_column = None
+        months = columns = values = None
+
+        for row_index, cells in iter_rows(zf, sheet_path, shared_strings):
+            if row_index < start_row:
+                for col, text in sorted(cells.items()):
+                    name = header_text(text)
+                    if name == "TOTAL":
+                        total_column = col
+                    elif row_index == header_row and name in month_cols_full:
+                        month_columns.append((col, name))
+                continue
+            if not cells.get(1, "").strip():
+                continue
+            if values is None:
+                months, columns = resolve_layout(month_columns, total_column, available_months)
+                values = np.zeros((capacity, len(columns)), dtype=np.int64)
+
+            n = len(makers)
+            if n == capacity:
+                capacity = max(capacity * 2, 16)
+                values = np.resize(values, (capacity, len(columns)))
+            makers.append(cells[1].strip())
+            values[n] = [to_int(cells.get(col)) for col in columns]
+
+    if values is None:
+        months, columns = resolve_layout(month_columns, total_column, available_months)
+        values = np.zeros((0, len(columns)), dtype=np.int64)
+    return makers, months, values[:len(makers)]
+
+
+def read_vahan_table(path, available_months=month_cols_full):
+    """Read one export into a VahanTable"""
+    makers, months, values = read_vahan_values(path, available_months)
+    return VahanTable(makers, months, values[:, :-1].astype(np.int32), values[:, -1])
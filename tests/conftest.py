@@ -0,0 +1,69 @@
+import os
+import sys
+import zipfile
+from xml.sax.saxutils import escape
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# scripts/ modules import each other as top-level modules
+for path in (ROOT, os.path.join(ROOT, "scripts")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+NBSP = "\xa0"
+
+
+def column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def write_sheet(path, rows):
+    """Minimal xlsx with one worksheet of inline strings; rows is a list of {column: text}"""
+    last_row = len(rows)
+    last_col = max((max(row) for row in rows if row), default=0)
+    xml_rows = []
+    for r, row in enumerate(rows, start=1):
+        cells = "".join(
+            f'<c r="{column_letter(c)}{r}" t="inlineStr"><is><t>{escape(text)}</t></is></c>'
+            for c, text in sorted(row.items())
+        )
+        xml_rows.append(f'<row r="{r}">{cells}</row>')
+    sheet = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f'<dimension ref="A1:{column_letter(last_col)}{last_row}"/>'
+        f'<sheetData>{"".join(xml_rows)}</sheetData></worksheet>'
+    )
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("xl/worksheets/sheet1.xml", sheet)
+    return path
+
+
+def vahan_rows(months, makers, title="Maker Month Wise Data"):
+    """Rows laid out like a Vahan export: title, header with padded TOTAL, month names, data"""
+    total_col = 2 + len(months)
+    rows = [
+        {0: title},
+        {0: "S No", 1: f"{NBSP * 5} Maker {NBSP * 5}", 2: "Month Wise ", total_col: f"{NBSP * 5}TOTAL{NBSP * 5}"},
+        {},
+        {0: "", 1: "", **{2 + i: month for i, month in enumerate(months)}, total_col: ""},
+    ]
+    for n, (maker, counts, total) in enumerate(makers, start=1):
+        row = {0: str(n), 1: maker, total_col: total}
+        row.update({2 + i: value for i, value in enumerate(counts)})
+        rows.append(row)
+    return rows
+
+
+@pytest.fixture
+def vahan_sheet(tmp_path):
+    """Factory writing a Vahan-shaped export and returning its path"""
+    def make(months, makers, name="export.xlsx"):
+        return str(write_sheet(tmp_path / name, vahan_rows(months, makers)))
+    return make
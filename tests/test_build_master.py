@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+from build_master import check_mismatches, mismatch_report
+
+
+def master_frame(years_and_flags):
+    return pd.DataFrame({
+        'YEAR': pd.Categorical([year for year, _ in years_and_flags]),
+        'TOTAL_MISMATCH': [flag for _, flag in years_and_flags],
+    })
+
+
+def test_mismatch_report_counts_per_year():
+    frame = master_frame([("2024", False), ("2024", True), ("2025", False)])
+
+    assert mismatch_report(frame) == {"2024": (2, 1), "2025": (1, 0)}
+
+
+def test_check_mismatches_fails_above_the_rate():
+    frame = master_frame([("2024", False)] * 99 + [("2024", True)] + [("2025", False)] * 10)
+
+    assert check_mismatches(frame, 0.01)
+    assert not check_mismatches(frame, 0.005)
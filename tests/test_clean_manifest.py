@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from clean_data import (carried_over_entries, clean_corpus, collect_jobs, load_manifest, month_cols_full,
+                        parquet_frame)
+
+
+def entry(output, source, year="2023"):
+    return {"output": output, "source": source, "status": "ok", "year": year}
+
+
+def test_carried_over_entries_keep_other_years_with_existing_sources(tmp_path):
+    kept_source = tmp_path / "kept.xlsx"
+    kept_source.write_bytes(b"")
+    previous = {
+        "out/2023/kept.xlsx": entry("out/2023/kept.xlsx", str(kept_source)),
+        "out/2023/deleted.xlsx": entry("out/2023/deleted.xlsx", str(tmp_path / "deleted.xlsx")),
+        "out/2024/current.xlsx": entry("out/2024/current.xlsx", str(kept_source), "2024"),
+    }
+
+    kept = carried_over_entries(previous, {"out/2024/current.xlsx"})
+
+    assert [e["output"] for e in kept] == ["out/2023/kept.xlsx"]
+
+
+def test_force_keeps_manifest_entries_of_other_years(tmp_path):
+    source = tmp_path / "raw" / "2023" / "State" / "RTO.xlsx"
+    source.parent.mkdir(parents=True)
+    source.write_bytes(b"")
+    output = tmp_path / "cleaned"
+    output.mkdir()
+    manifest_path = output / "manifest.json"
+    with open(manifest_path, "w") as f:
+        json.dump({"files": [entry("cleaned/2023/State/RTO_cleaned.xlsx", str(source))]}, f)
+
+    # Nothing to clean for 2024, the 2023 entry must survive the forced run
+    clean_corpus(str(tmp_path / "raw"), str(output), ["2024"], workers=1, force=True)
+
+    assert list(load_manifest(str(manifest_path))) == ["cleaned/2023/State/RTO_cleaned.xlsx"]
+
+
+def test_parquet_frame_always_has_twelve_int32_months():
+    df = pd.DataFrame({"MAKER": ["ATHER ENERGY LTD"], "JAN": [3.0], "MAY": [2.0], "TOTAL": [5]})
+
+    frame = parquet_frame(df, "Panaji - GA1")
+
+    assert list(frame.columns) == ["RTO", "MAKER"] + month_cols_full + ["TOTAL"]
+    assert all(frame[month].dtype == "int32" for month in month_cols_full + ["TOTAL"])
+    assert frame.loc[0, ["JAN", "MAY", "JUN", "DEC"]].tolist() == [3, 2, 0, 0]
+
+
+def test_parquet_frame_without_maker_column_keeps_its_rows():
+    frame = parquet_frame(pd.DataFrame({"JAN": [1, 2]}), "Panaji - GA1")
+
+    assert len(frame) == 2
+    assert frame["MAKER"].isna().all()
+
+
+def test_collect_jobs_uses_absolute_paths(tmp_path, monkeypatch):
+    (tmp_path / "raw" / "2024" / "Goa").mkdir(parents=True)
+    (tmp_path / "raw" / "2024" / "Goa" / "Panaji.xlsx").write_bytes(b"")
+    monkeypatch.chdir(tmp_path)
+
+    [job] = collect_jobs("raw", "cleaned", ["2024"])
+
+    assert job[0] == str(tmp_path / "raw" / "2024" / "Goa" / "Panaji.xlsx")
+    assert job[1] == str(tmp_path / "cleaned" / "2024" / "Goa" / "Panaji_cleaned.xlsx")
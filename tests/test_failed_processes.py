@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+pytest.importorskip("selenium")
+
+from main import load_failed_processes
+
+
+def write_failed(path, processes):
+    with open(path, "w") as f:
+        json.dump(processes, f)
+    return str(path)
+
+
+def test_failed_files_are_merged_per_year_and_state(tmp_path):
+    first = write_failed(tmp_path / "failed_a.json", [
+        {"year": 2025, "state": "Goa(13)", "failed_rtos": ["GA1", "GA2"]},
+        {"year": "2025", "state": "Assam(36)", "failed_rtos": ["All RTOs (configuration failed)"]},
+        {"year": "2024", "state": "Kerala(87)", "failed_rtos": ["KL1"]},
+    ])
+    second = write_failed(tmp_path / "failed_b.json", [
+        {"year": "2025", "state": "Goa(13)", "failed_rtos": ["GA2", "GA3"]},
+        {"year": "2025", "state": "Assam(36)", "failed_rtos": ["AS1"]},
+        {"year": "2024", "state": "Kerala(87)", "failed_rtos": []},
+    ])
+
+    failed = load_failed_processes([first, second])
+
+    assert failed == {
+        ("2025", "Goa(13)"): ["GA1", "GA2", "GA3"],
+        # A whole-state entry is not narrowed down by a later file
+        ("2025", "Assam(36)"): None,
+        ("2024", "Kerala(87)"): None,
+    }
+
+
+class FakeBrowser:
+    def update_download_directory(self, path):
+        pass
+
+
+@pytest.fixture
+def retry_run(monkeypatch, tmp_path):
+    """Run start_retry with process_rto_wise_data answering from `outcomes`; returns the calls made"""
+    import main
+
+    calls = []
+    outcomes = {}
+
+    def process(processor, state, year, specific_rtos=None, ledger=None):
+        calls.append((year, state, specific_rtos))
+        return outcomes.get((year, state), [])
+
+    monkeypatch.setattr(main.sessions, "acquire", lambda profile: FakeBrowser())
+    monkeypatch.setattr(main, "RTOProcessor", lambda browser: object())
+    monkeypatch.setattr(main, "ProgressLedger", lambda: None)
+    monkeypatch.setattr(main, "process_rto_wise_data", process)
+    monkeypatch.setattr(main.profiler, "write_report", lambda: None)
+
+    def run(paths, passes=1, failing=None):
+        outcomes.update(failing or {})
+        main.start_retry(paths, passes)
+        return calls
+    return run
+
+
+def read_failed(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def test_configuration_failure_keeps_the_rto_list(retry_run, tmp_path):
+    path = write_failed(tmp_path / "failed.json", [
+        {"year": "2025", "state": "Goa(13)", "failed_rtos": ["GA1", "GA2"]},
+    ])
+
+    calls = retry_run([path], passes=2, failing={("2025", "Goa(13)"): ["All RTOs (configuration failed)"]})
+
+    assert calls == [("2025", "Goa(13)", ["GA1", "GA2"])]
+    assert read_failed(path) == [{"state": "Goa(13)", "year": "2025", "failed_rtos": ["GA1", "GA2"]}]
+
+
+def test_state_in_several_files_is_written_back_once(retry_run, tmp_path):
+    first = write_failed(tmp_path / "failed_a.json", [
+        {"year": "2025", "state": "Goa(13)", "failed_rtos": ["GA1"]},
+    ])
+    second = write_failed(tmp_path / "failed_b.json", [
+        {"year": "2025", "state": "Goa(13)", "failed_rtos": ["GA2"]},
+        {"year": "2024", "state": "Kerala(87)", "failed_rtos": ["KL1"]},
+    ])
+
+    retry_run([first, second], failing={("2025", "Goa(13)"): ["GA2"], ("2024", "Kerala(87)"): ["KL1"]})
+
+    assert read_failed(first) == [{"state": "Goa(13)", "year": "2025", "failed_rtos": ["GA2"]}]
+    assert read_failed(second) == [{"state": "Kerala(87)", "year": "2024", "failed_rtos": ["KL1"]}]
+
+
+def test_missing_file_is_logged_not_raised(retry_run, tmp_path):
+    assert retry_run([str(tmp_path / "failed_processes.json")]) == []
@@ -0,0 +1,56 @@
+import pytest
+
+from rto_processor.ledger import ProgressLedger
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    progress = ProgressLedger(str(tmp_path / "ledger.db"))
+    yield progress
+    progress.close()
+
+
+@pytest.fixture
+def export(tmp_path):
+    def make(name):
+        path = tmp_path / f"{name}.xlsx"
+        path.write_bytes(b"PK")
+        return str(path)
+    return make
+
+
+def test_done_needs_the_output_file(ledger, export, tmp_path):
+    ledger.record_attempt("2024", "Goa", "GA1")
+    assert not ledger.is_done("2024", "Goa", "GA1")
+
+    path = export("GA1")
+    ledger.mark_done("2024", "Goa", "GA1", path)
+    assert ledger.is_done("2024", "Goa", "GA1")
+
+    (tmp_path / "GA1.xlsx").unlink()
+    assert not ledger.is_done("2024", "Goa", "GA1")
+
+
+def test_state_done_counts_completed_rtos(ledger, export):
+    ledger.mark_done("2024", "Goa", "GA1", export("GA1"))
+    ledger.mark_failed("2024", "Goa", "GA2")
+    ledger.mark_state_done("2024", "Goa", 2)
+    assert not ledger.is_state_done("2024", "Goa")
+
+    ledger.mark_done("2024", "Goa", "GA2", export("GA2"))
+    assert ledger.completed_rtos("2024", "Goa") == {"GA1", "GA2"}
+    assert ledger.is_state_done("2024", "Goa")
+
+
+def test_reset_clears_one_state_or_a_whole_year(ledger, export):
+    for year, state, rto in [("2024", "Goa", "GA1"), ("2024", "Kerala", "KL1"), ("2023", "Goa", "GA1")]:
+        ledger.mark_done(year, state, rto, export(f"{year}_{rto}"))
+    ledger.mark_state_done("2024", "Goa", 1)
+
+    assert ledger.reset("2024", "Goa") == 1
+    assert not ledger.is_state_done("2024", "Goa")
+    assert ledger.is_done("2024", "Kerala", "KL1")
+
+    assert ledger.reset("2024") == 1
+    assert not ledger.is_done("2024", "Kerala", "KL1")
+    assert ledger.is_done("2023", "Goa", "GA1")
@@ -0,0 +1,73 @@
+import pytest
+
+from rto_processor.ledger import ProgressLedger
+from rto_processor.planner import (PlannedTask, build_tasks, load_plan_shard, mark_state_if_complete,
+                                   shard_tasks, write_plan)
+
+
+class FixedCosts:
+    setup_seconds = 10
+
+    def task_cost(self, state, rto_count):
+        return self.setup_seconds + rto_count
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    progress = ProgressLedger(str(tmp_path / "ledger.db"))
+    yield progress
+    progress.close()
+
+
+def task(name, cost):
+    return PlannedTask("2024", name, [name], cost)
+
+
+def test_lpt_balances_the_shards():
+    tasks = [task(name, cost) for name, cost in [("a", 7), ("b", 5), ("c", 4), ("d", 3), ("e", 3), ("f", 2)]]
+
+    shards = shard_tasks(tasks, 2)
+
+    assert sorted(sum(t.cost for t in shard) for shard in shards) == [12, 12]
+    assert [t.state for t in shards[0]] == ["a", "d", "f"]
+    assert all(shard == sorted(shard, key=lambda t: t.cost, reverse=True) for shard in shards)
+
+
+def test_build_tasks_chunks_pending_rtos(ledger, tmp_path):
+    done = tmp_path / "GA1.xlsx"
+    done.write_bytes(b"PK")
+    ledger.mark_done("2024", "Goa(5)", "GA1", str(done))
+    catalogue = {"Goa(5)": ["GA1", "GA2", "GA3", "GA4", "GA5"]}
+
+    tasks = build_tasks({"2024": ["Goa(5)", "Assam(3)"]}, ledger, catalogue, FixedCosts(), chunk_size=3)
+
+    assert tasks == [
+        PlannedTask("2024", "Goa(5)", ["GA2", "GA3", "GA4"], 13),
+        PlannedTask("2024", "Goa(5)", ["GA5"], 11),
+        PlannedTask("2024", "Assam(3)", None, 13),
+    ]
+
+
+def test_plan_round_trip_and_shard_validation(tmp_path):
+    path = str(tmp_path / "plan.json")
+    write_plan(shard_tasks([task("a", 2), task("b", 1)], 2), path)
+
+    assert load_plan_shard(path, 1) == [PlannedTask("2024", "b", ["b"], 1)]
+    with pytest.raises(ValueError, match="shards 0 to 1"):
+        load_plan_shard(path, 2)
+
+
+def test_state_is_marked_done_once_every_chunk_finished(ledger, tmp_path):
+    catalogue = {"Goa(2)": ["GA1", "GA2"]}
+    for rto in catalogue["Goa(2)"][:1]:
+        path = tmp_path / f"{rto}.xlsx"
+        path.write_bytes(b"PK")
+        ledger.mark_done("2024", "Goa(2)", rto, str(path))
+    assert not mark_state_if_complete(ledger, "2024", "Goa(2)", catalogue)
+
+    path = tmp_path / "GA2.xlsx"
+    path.write_bytes(b"PK")
+    ledger.mark_done("2024", "Goa(2)", "GA2", str(path))
+    assert mark_state_if_complete(ledger, "2024", "Goa(2)", catalogue)
+    assert ledger.is_state_done("2024", "Goa(2)")
+    assert build_tasks({"2024": ["Goa(2)"]}, ledger, catalogue, FixedCosts()) == []
@@ -0,0 +1,38 @@
+import pytest
+
+from rto_processor.profiling import Profiler
+
+
+def test_spans_are_aggregated_per_key():
+    profiler = Profiler()
+    for duration in (0.1, 0.3, 0.2):
+        profiler.record("apply_filters", duration, labels={"state": "Goa", "worker": 0})
+    profiler.record("apply_filters", 0.4, labels={"state": "Kerala", "worker": 0})
+    profiler.record("findElement", 0.05, kind="webdriver", labels={})
+
+    assert len(profiler.aggregates) == 3
+    report = profiler.report()
+    steps = report["steps"]["apply_filters"]
+    assert (steps["count"], steps["total_ms"], steps["max_ms"]) == (4, 1000.0, 400.0)
+    assert steps["p50_ms"] == pytest.approx(300, rel=0.1)
+    assert steps["p95_ms"] == 400.0
+    assert report["per_state"]["Goa"]["apply_filters"]["count"] == 3
+    assert report["per_state"]["Goa"]["apply_filters"]["p95_ms"] == pytest.approx(300, rel=0.1)
+    assert report["per_worker"]["0"]["apply_filters"]["max_ms"] == 400.0
+    assert report["webdriver"]["findElement"]["count"] == 1
+    assert report["totals_s"]["step"] == 1.0
+
+
+def test_percentiles_stay_accurate_with_bounded_memory():
+    profiler = Profiler()
+    for _ in range(100):
+        for i in range(1, 101):
+            profiler.record("download_excel_rto", i / 100, labels={"state": "Goa"})
+
+    stats = profiler.aggregates[("step", "download_excel_rto", "Goa", None)]
+    assert len(stats.buckets) < 60
+    summary = profiler.report()["steps"]["download_excel_rto"]
+    assert summary["count"] == 10000
+    assert summary["p50_ms"] == pytest.approx(510, rel=0.1)
+    assert summary["p95_ms"] == pytest.approx(960, rel=0.1)
+    assert summary["max_ms"] == 1000.0
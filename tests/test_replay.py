@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+pytest.importorskip("requests")
+
+from rto_processor.replay import JSFReplayEngine
+from rto_processor.replay_stub import load_recordings, start_stub_server
+
+RECORDINGS = os.path.join(os.path.dirname(__file__), "fixtures", "replay")
+
+
+class OutputPaths:
+    """Stands in for RTOProcessor, which the engine only asks for output paths"""
+
+    def __init__(self, base):
+        self.base = base
+
+    def get_output_path(self, state_name, year, rto_name):
+        return os.path.join(self.base, str(year), state_name, f"{rto_name}.xlsx")
+
+
+@pytest.fixture
+def stub_url():
+    server = start_stub_server(RECORDINGS)
+    yield f"http://127.0.0.1:{server.server_port}/vahan4dashboard/vahan/view/reportview.xhtml"
+    server.shutdown()
+    server.server_close()
+
+
+def test_replay_selects_year_and_rto_and_exports_through_the_stub(stub_url, tmp_path):
+    engine = JSFReplayEngine(OutputPaths(str(tmp_path)), base_url=stub_url)
+    engine.bootstrap()
+    assert engine.view_state == "view-1"
+    fields = dict(engine.form["fields"])
+    assert fields["j_idt41_input"] == "GA"
+
+    # The year change re-renders the RTO dropdown of the selected state
+    assert engine.select_year("2024")
+    assert engine.view_state == "view-2"
+    assert "Panaji - GA1( 01-JAN-2020 )" in engine.form["selects"]["selectedRto_input"]["options"]
+
+    rto = "Panaji - GA1( 01-JAN-2020 )"
+    assert engine.select_specific_rto(rto, "Goa", "2024")
+    assert dict(engine.form["fields"])["selectedRto_input"] == "1"
+
+    assert engine.apply_filters()
+    assert engine.view_state == "view-5"
+    assert [v for n, v in engine.form["fields"] if n == "fuel"] == ["ELECTRIC(BOV)", "PURE EV"]
+    assert len([n for n, _ in engine.form["fields"] if n == "VhCatg"]) == 3
+
+    assert engine.download_excel_rto("Goa", "2024", rto)
+    with open(engine.last_download_path, "rb") as f:
+        assert f.read() == load_recordings(RECORDINGS)[("POST", "groupingTable:xls")]["body"]
+
+
+def test_replay_does_not_retry_posts():
+    engine = JSFReplayEngine(OutputPaths("."), base_url="http://127.0.0.1")
+    retry = engine.session.get_adapter("http://127.0.0.1").max_retries
+
+    assert retry.is_retry("GET", 503)
+    assert not retry.is_retry("POST", 503)
@@ -0,0 +1,73 @@
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from rto_processor.uploader import S3Uploader
+
+BUCKET = "vahan-test"
+
+
+@pytest.fixture
+def uploader(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield S3Uploader(bucket=BUCKET, prefix="rto_wise_data/", workers=2, client=client)
+
+
+def test_upload_skips_identical_content_and_reuploads_changes(uploader, tmp_path):
+    path = tmp_path / "Panaji.xlsx"
+    path.write_bytes(b"PK first export")
+    key = "rto_wise_data/2024/Goa/Panaji.xlsx"
+
+    assert uploader.upload(str(path), key) == "uploaded"
+    assert uploader.upload(str(path), key) == "skipped"
+
+    path.write_bytes(b"PK second export")
+    assert uploader.upload(str(path), key) == "uploaded"
+    stored = uploader.client.get_object(Bucket=BUCKET, Key=key)
+    assert stored["Body"].read() == b"PK second export"
+    assert stored["ContentType"].startswith("application/vnd.openxmlformats")
+
+
+def test_background_threads_upload_submitted_files(uploader, tmp_path):
+    paths = []
+    for name in ("GA1", "GA2", "GA3"):
+        path = tmp_path / f"{name}.xlsx"
+        path.write_bytes(name.encode())
+        paths.append(path)
+
+    uploader.start()
+    for path in paths:
+        uploader.submit(str(path), f"rto_wise_data/{path.name}")
+    uploader.submit(str(paths[0]), f"rto_wise_data/{paths[0].name}")
+    stats = uploader.close()
+
+    assert stats["uploaded"] + stats["skipped"] == 4 and stats["failed"] == 0
+    listed = uploader.client.list_objects_v2(Bucket=BUCKET, Prefix="rto_wise_data/")["Contents"]
+    assert sorted(obj["Key"] for obj in listed) == [f"rto_wise_data/{p.name}" for p in paths]
+
+
+def test_multipart_etag_matches_so_the_second_upload_is_skipped(monkeypatch, tmp_path):
+    from configs import config
+
+    part = 5 * 1024 * 1024
+    monkeypatch.setattr(config, "S3_MULTIPART_THRESHOLD", part)
+    monkeypatch.setattr(config, "S3_MULTIPART_CHUNKSIZE", part)
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    path = tmp_path / "big.xlsx"
+    path.write_bytes(b"x" * (part + 1024))
+
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        uploader = S3Uploader(bucket=BUCKET, prefix="", workers=1, client=client)
+
+        assert uploader.upload(str(path), "big.xlsx") == "uploaded"
+        assert uploader.remote_etag("big.xlsx").endswith("-2")
+        assert uploader.upload(str(path), "big.xlsx") == "skipped"
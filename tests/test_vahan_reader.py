@@ -0,0 +1,52 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from vahan_reader import read_vahan_table, read_vahan_values
+from normalize import normalize_batch
+from build_master import full_year_values
+
+MONTHS_2025 = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN']
+
+
+def test_2025_sheet_keeps_june_and_reads_total_by_header(vahan_sheet):
+    path = vahan_sheet(MONTHS_2025, [
+        ("ASHOK LEYLAND LTD", ["18", "36", "37", "18", "34", "5"], "148"),
+        ("AJAX ENGINEERING LTD", ["1", "0", "0", "0", "0", "0"], "1"),
+    ])
+
+    # months_for_year('2025') still stops at MAY
+    table = read_vahan_table(path, MONTHS_2025[:5])
+
+    assert table.months == MONTHS_2025
+    assert table.makers == ["ASHOK LEYLAND LTD", "AJAX ENGINEERING LTD"]
+    assert table.counts.dtype == np.int32
+    assert table.counts[0].tolist() == [18, 36, 37, 18, 34, 5]
+    assert table.vahan_totals.tolist() == [148, 1]
+
+
+def test_values_are_int64_and_thousands_separators_parse(vahan_sheet):
+    path = vahan_sheet(['JAN', 'FEB'], [("MAKER A", ["1,234", ""], "1,234")])
+
+    makers, months, values = read_vahan_values(path)
+
+    assert values.dtype == np.int64
+    assert values.tolist() == [[1234, 0, 1234]]
+
+
+def test_empty_sheet_returns_no_rows(vahan_sheet):
+    makers, months, values = read_vahan_values(vahan_sheet(MONTHS_2025, []))
+
+    assert makers == []
+    assert values.shape == (0, len(MONTHS_2025) + 1)
+
+
+def test_normalize_batch_flags_only_disagreeing_rows(vahan_sheet):
+    good = read_vahan_values(vahan_sheet(['JAN', 'FEB'], [("A", ["1", "2"], "3")], "good.xlsx"))
+    bad = read_vahan_values(vahan_sheet(MONTHS_2025, [("B", ["1"] * 6, "7")], "bad.xlsx"))
+
+    batch = normalize_batch([full_year_values(good[2], good[1]), full_year_values(bad[2], bad[1])])
+
+    assert batch.totals.tolist() == [3, 6]
+    assert batch.mismatch.tolist() == [False, True]
+    assert batch.counts.shape == (2, 12)
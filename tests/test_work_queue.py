@@ -0,0 +1,100 @@
+import time
+
+import pytest
+
+from rto_processor.work_queue import ALL_RTOS, WorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    work_queue = WorkQueue(str(tmp_path / "queue.db"))
+    yield work_queue
+    work_queue.close()
+
+
+def attempts(queue, rto):
+    return queue.conn.execute("SELECT attempts FROM tasks WHERE rto = ?", (rto,)).fetchone()[0]
+
+
+def test_lease_takes_one_state_with_listing_tasks_first(queue):
+    assert queue.enqueue([("2024", "Goa", "GA1"), ("2024", "Goa", "GA2"),
+                          ("2024", "Kerala", ALL_RTOS), ("2024", "Goa", "GA1")]) == 3
+
+    assert queue.lease("node-a", limit=5) == [("2024", "Kerala", ALL_RTOS)]
+    assert queue.lease("node-b", limit=5) == [("2024", "Goa", "GA1"), ("2024", "Goa", "GA2")]
+    assert queue.lease("node-c", limit=5) == []
+
+
+def test_lease_prefers_the_configured_state(queue):
+    queue.enqueue([("2024", "Assam", "AS1"), ("2024", "Goa", "GA1")])
+
+    assert queue.lease("node-a", limit=1, prefer=("2024", "Goa")) == [("2024", "Goa", "GA1")]
+
+
+def test_expired_leases_are_handed_out_again(queue):
+    queue.enqueue([("2024", "Goa", "GA1")])
+    queue.lease("node-a", lease_seconds=0.01)
+    time.sleep(0.02)
+
+    assert queue.lease("node-b") == [("2024", "Goa", "GA1")]
+    # node-a lost the lease and can no longer complete the task
+    queue.complete("node-a", "2024", "Goa", "GA1")
+    assert queue.counts() == {"leased": 1}
+    queue.complete("node-b", "2024", "Goa", "GA1")
+    assert queue.is_drained()
+
+
+def test_fail_retries_until_max_attempts(queue):
+    queue.enqueue([("2024", "Goa", "GA1")])
+    for _ in range(2):
+        queue.lease("node-a")
+        queue.fail("node-a", "2024", "Goa", "GA1", max_attempts=2)
+
+    assert queue.failed_tasks() == [("2024", "Goa", "GA1")]
+    assert queue.is_drained()
+
+
+def test_fail_needs_the_lease(queue):
+    queue.enqueue([("2024", "Goa", "GA1")])
+    queue.lease("node-a")
+
+    queue.fail("node-b", "2024", "Goa", "GA1")
+    assert queue.counts() == {"leased": 1}
+
+
+def test_release_returns_tasks_without_counting_the_attempt(queue):
+    queue.enqueue([("2024", "Goa", "GA1"), ("2024", "Goa", "GA2")])
+    leased = queue.lease("node-a")
+
+    queue.release("node-b", leased)
+    assert queue.counts() == {"leased": 2}
+    queue.release("node-a", leased[1:])
+
+    assert queue.counts() == {"leased": 1, "pending": 1}
+    assert attempts(queue, "GA2") == 0
+    assert queue.lease("node-b") == [("2024", "Goa", "GA2")]
+
+
+def test_task_whose_node_keeps_dying_is_failed(queue, monkeypatch):
+    from configs import config
+
+    monkeypatch.setattr(config, "QUEUE_MAX_ATTEMPTS", 2)
+    queue.enqueue([("2024", "Goa", "GA1")])
+    for node in ("node-a", "node-b"):
+        assert queue.lease(node, lease_seconds=0.01) == [("2024", "Goa", "GA1")]
+        time.sleep(0.02)
+
+    assert queue.lease("node-c") == []
+    assert queue.failed_tasks() == [("2024", "Goa", "GA1")]
+    assert queue.is_drained()
+
+
+def test_reclaim_expired_fails_tasks_at_max_attempts(queue):
+    queue.enqueue([("2024", "Goa", "GA1"), ("2024", "Goa", "GA2")])
+    queue.lease("node-a", lease_seconds=0.01)
+    queue.conn.execute("UPDATE tasks SET attempts = 3 WHERE rto = 'GA2'")
+    time.sleep(0.02)
+
+    assert queue.reclaim_expired(max_attempts=3) == 2
+    assert queue.counts() == {"pending": 1, "failed": 1}
+    assert queue.failed_tasks() == [("2024", "Goa", "GA2")]
@@ -0,0 +1,81 @@
+import json
+import queue
+import threading
+
+import pytest
+
+pytest.importorskip("selenium")
+
+import main
+from rto_processor.ledger import ProgressLedger
+from rto_processor.planner import mark_state_if_complete
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    progress = ProgressLedger(str(tmp_path / "ledger.db"))
+    yield progress
+    progress.close()
+
+
+@pytest.fixture
+def worker(monkeypatch, tmp_path):
+    """
+    run_worker on a stubbed session: process_rto_wise_data "exports" every
+    RTO of a chunk except those in `failing`, and records it in the ledger.
+    """
+    failing = set()
+
+    def process(processor, state, year, specific_rtos=None, ledger=None):
+        failed = [rto for rto in specific_rtos if rto in failing]
+        for rto in specific_rtos:
+            if rto not in failing:
+                path = tmp_path / f"{year}_{rto}.xlsx"
+                path.write_bytes(b"PK")
+                ledger.mark_done(year, state, rto, str(path))
+        return failed
+
+    monkeypatch.setattr(main.sessions, "acquire", lambda profile, download_dir=None: object())
+    monkeypatch.setattr(main, "RTOProcessor", lambda browser: object())
+    monkeypatch.setattr(main, "process_rto_wise_data", process)
+
+    def run(chunks, ledger, fail=(), workers=1):
+        failing.update(fail)
+        tasks = queue.Queue()
+        for year, state, rtos in chunks:
+            tasks.put(("state", year, state, rtos))
+        failed, failed_lock = {}, threading.Lock()
+        threads = [threading.Thread(target=main.run_worker,
+                                    args=(worker_id, tasks, failed, failed_lock, "state", ledger))
+                   for worker_id in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return failed
+    return run
+
+
+def test_chunked_state_is_marked_done_after_its_last_chunk(worker, ledger, monkeypatch):
+    catalogue = {"Goa(3)": ["GA1", "GA2", "GA3"]}
+    monkeypatch.setattr(main, "mark_state_if_complete",
+                        lambda ledger, year, state: mark_state_if_complete(ledger, year, state, catalogue))
+
+    worker([("2024", "Goa(3)", ["GA1", "GA2"])], ledger)
+    assert not ledger.is_state_done("2024", "Goa(3)")
+
+    worker([("2024", "Goa(3)", ["GA3"])], ledger)
+    assert ledger.is_state_done("2024", "Goa(3)")
+
+
+def test_workers_merge_failures_into_one_failed_processes_file(worker, ledger, tmp_path):
+    chunks = [("2024", "Goa(4)", ["GA1", "GA2"]), ("2024", "Goa(4)", ["GA3", "GA4"]),
+              ("2024", "Kerala(2)", ["KL1", "KL2"]), ("2025", "Goa(4)", ["GA1"])]
+
+    failed = worker(chunks, ledger, fail={"GA2", "GA4", "KL1"}, workers=3)
+    path = str(tmp_path / "failed_processes.json")
+    main.report_failed_processes(failed, path)
+
+    with open(path) as f:
+        written = {(p["year"], p["state"]): sorted(p["failed_rtos"]) for p in json.load(f)}
+    assert written == {("2024", "Goa(4)"): ["GA2", "GA4"], ("2024", "Kerala(2)"): ["KL1"]}